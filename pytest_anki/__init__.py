@@ -33,11 +33,56 @@
 A simple pytest plugin for testing Anki add-ons
 """
 
-__all__ = ["AnkiStateUpdate", "AnkiWebViewType", "AnkiSessionError", "AnkiSession"]
+__all__ = [
+    "AddonInstallMode",
+    "AddonLoadReport",
+    "AnkiStateUpdate",
+    "AnkiWebViewType",
+    "AnkiSessionError",
+    "AnkiSession",
+    "InstalledNotes",
+    "NoteSpec",
+    "NotesSpec",
+    "NoteTypeSpec",
+    "SyntheticCollection",
+    "TemplateSpec",
+    "WebViewMetrics",
+]
+
+import importlib
+from typing import TYPE_CHECKING, Any
 
 from ._anki import AnkiStateUpdate, AnkiWebViewType  # noqa: F401
 from ._errors import AnkiSessionError  # noqa: F401
-from ._session import AnkiSession  # noqa: F401
+from ._notes import (  # noqa: F401
+    InstalledNotes,
+    NoteSpec,
+    NotesSpec,
+    NoteTypeSpec,
+    TemplateSpec,
+)
+from ._synthetic import SyntheticCollection  # noqa: F401
+from ._types import AddonInstallMode  # noqa: F401
+
+if TYPE_CHECKING:
+    from ._addons import AddonLoadReport  # noqa: F401
+    from ._session import AnkiSession  # noqa: F401
+    from ._webviews import WebViewMetrics  # noqa: F401
+
+# These pull in aqt, Qt, and selenium, so we only import them on first access
+# rather than whenever pytest loads the plugin
+_LAZY_EXPORTS = {
+    "AddonLoadReport": "._addons",
+    "AnkiSession": "._session",
+    "WebViewMetrics": "._webviews",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if (module_name := _LAZY_EXPORTS.get(name)) is not None:
+        return getattr(importlib.import_module(module_name, __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __version__ = "1.0.0-beta.7"
 __author__ = "Aristotelis P. (Glutanimate), Michal Krassowski"
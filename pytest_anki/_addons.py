@@ -28,14 +28,39 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+import builtins
+import json
 import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, NamedTuple, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+from unittest import mock
 
-from aqt.addons import AddonManager
+from ._anki import get_anki_version
+from ._cache import mark_used
+from ._types import AddonInstallMode, PathLike
+from ._util import create_json, hash_file, hash_folder, move_into_place
 
-from ._types import PathLike
-from ._util import create_json
+if TYPE_CHECKING:
+    from aqt.addons import AddonManager
+
+# Add-on folder entries that Anki or add-ons write to at runtime, and that
+# therefore always need to be copied into the Anki base directory
+_WRITABLE_ADDON_ENTRIES = ("meta.json", "user_files")
 
 
 def _to_path(path: PathLike) -> Path:
@@ -45,17 +70,91 @@ def _to_path(path: PathLike) -> Path:
     return path_obj
 
 
-def install_addon_from_package(addon_manager: AddonManager, addon_path: PathLike):
+def install_addon_from_package(
+    addon_manager: "AddonManager",
+    addon_path: PathLike,
+    cache_dir: Optional[PathLike] = None,
+):
     addon_path = _to_path(addon_path)
     if addon_path.suffix != ".ankiaddon":
         raise ValueError("Provided path is not an .ankiaddon file")
+
+    if cache_dir is None:
+        addon_manager.install(str(addon_path))
+        return
+
+    install_cached_addon_package(
+        addon_manager=addon_manager, addon_path=addon_path, cache_dir=cache_dir
+    )
+
+
+def install_cached_addon_package(
+    addon_manager: "AddonManager", addon_path: Path, cache_dir: PathLike
+):
+    """Install .ankiaddon file, reusing the result of a previous installation of
+    the same package if available.
+
+    Cache entries hold the installed add-on tree, including the meta.json
+    written by the add-on manager, as well as the parts of the manifest that
+    are needed to replay the installation. They are keyed by the SHA-256 digest
+    of the package contents and the Anki version, so that changes to either
+    result in a fresh installation.
+    """
+    package_key = f"{hash_file(addon_path)}-{get_anki_version()}"
+    package_root = Path(cache_dir) / "packages"
+    cached_path = package_root / package_key
+    cached_manifest_path = cached_path / "manifest.json"
+    cached_addon_path = cached_path / "addon"
+
+    if cached_path.is_dir():
+        manifest = json.loads(cached_manifest_path.read_text(encoding="utf-8"))
+        package = manifest["package"]
+        destination_path = Path(addon_manager.addonsFolder(package))
+
+        # Updates of existing add-ons need to preserve user_files, which is
+        # best left to the add-on manager
+        if not destination_path.exists():
+            mark_used(cached_path)
+            addon_manager._disableConflicting(package, manifest["conflicts"])
+            shutil.copytree(src=cached_addon_path, dst=destination_path)
+            return
+
+    with zipfile.ZipFile(addon_path) as addon_file:
+        manifest = addon_manager.readManifestFile(addon_file)
+
     addon_manager.install(str(addon_path))
 
+    if not manifest or cached_path.is_dir():
+        return
+
+    package = manifest["package"]
+    installed_path = Path(addon_manager.addonsFolder(package))
+
+    if not installed_path.is_dir():  # installation failed
+        return
+
+    package_root.mkdir(parents=True, exist_ok=True)
+    staging_path = Path(tempfile.mkdtemp(prefix=f".{package_key}_", dir=package_root))
+
+    shutil.copytree(
+        src=installed_path,
+        dst=staging_path / cached_addon_path.name,
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    create_json(
+        staging_path / cached_manifest_path.name,
+        {"package": package, "conflicts": manifest.get("conflicts", [])},
+    )
+
+    move_into_place(staging_path=staging_path, target_path=cached_path)
+
 
 def install_addon_from_folder(
     anki_base_dir: PathLike,
     package_name: str,
     addon_path: PathLike,
+    install_mode: AddonInstallMode = AddonInstallMode.copy,
+    cache_dir: Optional[PathLike] = None,
 ):
     addon_path = _to_path(addon_path)
     anki_base_dir = _to_path(anki_base_dir)
@@ -64,7 +163,77 @@ def install_addon_from_folder(
     if not package_name:
         raise ValueError("Package name must not be empty")
     destination_path = anki_base_dir / "addons21" / package_name
-    shutil.copytree(src=addon_path, dst=destination_path, dirs_exist_ok=True)
+
+    if install_mode == AddonInstallMode.copy:
+        shutil.copytree(src=addon_path, dst=destination_path, dirs_exist_ok=True)
+        return
+
+    if install_mode == AddonInstallMode.cache:
+        if cache_dir is None:
+            raise ValueError("Cached add-on installs require a cache folder")
+        addon_path = get_cached_addon_folder(cache_dir=cache_dir, addon_path=addon_path)
+
+    link_addon_folder(source_path=addon_path, destination_path=destination_path)
+
+
+def get_cached_addon_folder(cache_dir: PathLike, addon_path: PathLike) -> Path:
+    """Get path to a cached copy of the provided add-on folder, creating it first
+    if the folder's current contents have not been cached yet"""
+    addon_key = hash_folder(addon_path)
+    addon_root = Path(cache_dir) / "addons"
+    cached_path = addon_root / addon_key
+
+    if cached_path.is_dir():
+        mark_used(cached_path)
+        return cached_path
+
+    addon_root.mkdir(parents=True, exist_ok=True)
+    staging_path = tempfile.mkdtemp(prefix=f".{addon_key}_", dir=addon_root)
+
+    shutil.copytree(
+        src=addon_path,
+        dst=staging_path,
+        dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+
+    move_into_place(staging_path=staging_path, target_path=cached_path)
+
+    return cached_path
+
+
+def link_addon_folder(source_path: Path, destination_path: Path):
+    """Populate add-on folder with symlinks to the entries of the source folder
+
+    The source's __pycache__ folder is linked as well, so that bytecode compiled
+    in one session is reused by all subsequent ones. It is skipped if it does
+    not exist and cannot be created, e.g. in read-only checkouts. Entries that
+    are written to at runtime are copied instead, keeping the source folder free
+    of any other state.
+    """
+    destination_path.mkdir(parents=True, exist_ok=True)
+
+    try:
+        (source_path / "__pycache__").mkdir(exist_ok=True)
+    except OSError:
+        pass
+
+    for source_entry in source_path.iterdir():
+        destination_entry = destination_path / source_entry.name
+
+        if destination_entry.is_symlink() or destination_entry.is_file():
+            destination_entry.unlink()
+        elif destination_entry.is_dir():
+            shutil.rmtree(destination_entry)
+
+        if source_entry.name not in _WRITABLE_ADDON_ENTRIES:
+            destination_entry.symlink_to(
+                source_entry, target_is_directory=source_entry.is_dir()
+            )
+        elif source_entry.is_dir():
+            shutil.copytree(src=source_entry, dst=destination_entry)
+        else:
+            shutil.copy2(src=source_entry, dst=destination_entry)
 
 
 class ConfigPaths(NamedTuple):
@@ -85,6 +254,8 @@ def create_addon_config(
 
     if default_config:
         defaults_path = addon_path / "config.json"
+        if defaults_path.is_symlink():  # avoid writing through to add-on source
+            defaults_path.unlink()
         create_json(defaults_path, default_config)
 
     if user_config:
@@ -92,3 +263,64 @@ def create_addon_config(
         create_json(meta_path, {"config": user_config})
 
     return ConfigPaths(defaults_path, meta_path)
+
+
+@dataclass
+class AddonLoadReport:
+
+    """
+    Describes the cost of importing an add-on package at load time
+    """
+
+    package_name: str
+    import_time: float  # wall time in seconds
+    modules_imported: int  # number of modules newly added to sys.modules
+    hooks_registered: Dict[str, int] = field(default_factory=dict)  # hook: count
+
+
+@contextmanager
+def addon_imports_profiled(
+    package_names: Iterable[str], reports: List[AddonLoadReport]
+) -> Iterator[None]:
+    """Context manager that profiles the top-level imports of the specified add-on
+    packages, appending an AddonLoadReport to reports for each of them"""
+    # Imported here, as the rest of this module is also used without Qt
+    from ._reset import get_hook_callback_counts
+
+    profiled_package_names = set(package_names)
+    original_import = builtins.__import__
+    profiling_active = False
+
+    def profiling_import(name, globals=None, locals=None, fromlist=(), level=0):
+        nonlocal profiling_active
+
+        # Imports performed by an add-on count towards that add-on
+        if profiling_active or level != 0 or name not in profiled_package_names:
+            return original_import(name, globals, locals, fromlist, level)
+
+        profiling_active = True
+        modules_before = set(sys.modules)
+        hook_counts_before = get_hook_callback_counts()
+        start_time = time.perf_counter()
+
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            import_time = time.perf_counter() - start_time
+            hooks_registered = {
+                hook: count - hook_counts_before.get(hook, 0)
+                for hook, count in get_hook_callback_counts().items()
+                if count > hook_counts_before.get(hook, 0)
+            }
+            reports.append(
+                AddonLoadReport(
+                    package_name=name,
+                    import_time=import_time,
+                    modules_imported=len(set(sys.modules) - modules_before),
+                    hooks_registered=hooks_registered,
+                )
+            )
+            profiling_active = False
+
+    with mock.patch.object(builtins, "__import__", profiling_import):
+        yield
@@ -28,6 +28,7 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+import copy
 from dataclasses import dataclass
 from enum import Enum
 from typing import TYPE_CHECKING, Any, Dict, Optional, Union
@@ -158,16 +159,22 @@ def set_anki_object_data(
     )
 
     if storage_object == AnkiStorageObject.colconf_storage:
-        # mw.col.conf dict API is deprecated in favor of ConfigManager API
-        collection = get_collection(main_window=main_window)
-        for key, value in data.items():
-            collection.set_config(key, value)
+        update_collection_config(
+            collection=get_collection(main_window=main_window), data=data
+        )
     else:
         anki_object.update(data)  # type: ignore
 
     return anki_object
 
 
+def update_collection_config(collection: "Collection", data: Dict[str, Any]):
+    """Update collection config (mw.col.conf) with the specified data"""
+    # mw.col.conf dict API is deprecated in favor of ConfigManager API
+    for key, value in data.items():
+        collection.set_config(key, value)
+
+
 def get_anki_object(
     main_window: "AnkiQt", storage_object: AnkiStorageObject
 ) -> Union[Dict[str, Any], "ConfigManager"]:
@@ -181,6 +188,69 @@ def get_anki_object(
         )
 
 
+def get_anki_state(main_window: "AnkiQt") -> AnkiStateUpdate:
+    """Get a copy of the full current data of all Anki storage objects described by
+    AnkiStateUpdate. Storage objects that are not available, e.g. because no profile
+    has been loaded, are left unset."""
+    meta_storage = copy.deepcopy(main_window.pm.meta)
+
+    if main_window.pm.profile is not None:
+        profile_storage: Optional[Dict[str, Any]] = copy.deepcopy(
+            main_window.pm.profile
+        )
+    else:
+        profile_storage = None
+
+    if (collection := main_window.col) is not None:
+        colconf_storage: Optional[Dict[str, Any]] = _get_all_config(collection)
+    else:
+        colconf_storage = None
+
+    return AnkiStateUpdate(
+        colconf_storage=colconf_storage,
+        profile_storage=profile_storage,
+        meta_storage=meta_storage,
+    )
+
+
+def reset_anki_state(main_window: "AnkiQt", anki_state: AnkiStateUpdate):
+    """Reset Anki storage objects to a state previously obtained via get_anki_state,
+    removing any keys that were added in the meantime. Storage objects that are
+    unset in the provided state or currently unavailable are skipped."""
+    for storage_dict, data in (
+        (main_window.pm.meta, anki_state.meta_storage),
+        (main_window.pm.profile, anki_state.profile_storage),
+    ):
+        if storage_dict is None or data is None:
+            continue
+        storage_dict.clear()
+        storage_dict.update(copy.deepcopy(data))
+
+    collection = main_window.col
+
+    if collection is None or anki_state.colconf_storage is None:
+        return
+
+    current_colconf = _get_all_config(collection)
+
+    for key in current_colconf.keys() - anki_state.colconf_storage.keys():
+        try:  # 2.1.28+
+            collection.remove_config(key)
+        except AttributeError:  # legacy
+            del collection.conf[key]  # type: ignore
+
+    for key, value in anki_state.colconf_storage.items():
+        if current_colconf.get(key) != value:
+            collection.set_config(key, value)
+
+
+def _get_all_config(collection: "Collection") -> Dict[str, Any]:
+    try:  # 2.1.45+
+        return collection.all_config()
+    except AttributeError:  # legacy
+        return copy.deepcopy(dict(collection.conf))  # type: ignore
+
+
 def get_anki_version() -> Version:
     try:
         from anki.buildinfo import version
@@ -0,0 +1,111 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from ._types import PathLike
+
+# Folders of the cache directory that hold individual cache entries, i.e. base
+# directory templates, extracted deck packages, unpacked add-on snapshots,
+# installed add-on packages, and collection snapshots of imported decks
+CACHE_ENTRY_FOLDERS = ("templates", "decks", "addons", "packages", "snapshots")
+
+_VERSIONED_CACHE_DIR_PREFIX = "pytest-anki-"
+
+# Staging folders are only removed once they are old enough to not belong to
+# a concurrent run that is still building the corresponding entry
+_STALE_STAGING_AGE = 24 * 60 * 60
+
+
+def get_versioned_cache_dir(cache_base: PathLike) -> Path:
+    """Get folder for cache entries created by the current pytest-anki version
+    within a persistent cache folder"""
+    from . import __version__
+
+    return Path(cache_base) / f"{_VERSIONED_CACHE_DIR_PREFIX}{__version__}"
+
+
+def mark_used(path: PathLike):
+    """Record use of a cache entry, so that recently used entries are evicted last"""
+    try:
+        os.utime(path)
+    except OSError:  # entry evicted concurrently
+        pass
+
+
+def _get_size(path: Path) -> int:
+    return sum(
+        file_path.lstat().st_size
+        for file_path in path.rglob("*")
+        if file_path.is_file() and not file_path.is_symlink()
+    )
+
+
+def evict_cache_entries(cache_base: PathLike, max_size: int):
+    """Remove least recently used cache entries until the cache takes up no more
+    than max_size bytes. Entries created by other pytest-anki versions are always
+    removed, while any other content of cache_base is left untouched."""
+    cache_base = Path(cache_base)
+    if not cache_base.is_dir():
+        return
+
+    versioned_cache_dir = get_versioned_cache_dir(cache_base)
+
+    for path in cache_base.glob(f"{_VERSIONED_CACHE_DIR_PREFIX}*"):
+        if path.is_dir() and path != versioned_cache_dir:
+            shutil.rmtree(path, ignore_errors=True)
+
+    stale_staging_time = time.time() - _STALE_STAGING_AGE
+
+    entries: List[Tuple[float, int, Path]] = []
+
+    for folder_name in CACHE_ENTRY_FOLDERS:
+        folder = versioned_cache_dir / folder_name
+        if not folder.is_dir():
+            continue
+        for entry in folder.iterdir():
+            if entry.name.startswith("."):
+                # Leftover staging folders of interrupted runs are removed as well
+                if entry.stat().st_mtime < stale_staging_time:
+                    shutil.rmtree(entry, ignore_errors=True)
+                continue
+            entries.append((entry.stat().st_mtime, _get_size(entry), entry))
+
+    total_size = sum(size for _, size, _ in entries)
+
+    for _, size, entry in sorted(entries, key=lambda item: item[0]):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total_size -= size
@@ -0,0 +1,192 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import base64
+import json
+import os
+import socket
+import struct
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from ._errors import AnkiSessionError
+
+_OPCODE_CONTINUATION = 0x0
+_OPCODE_TEXT = 0x1
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+
+
+class CDPClient:
+
+    """
+    Minimal Chrome DevTools Protocol client for a single devtools target.
+
+    Implements just enough of the WebSocket protocol (RFC 6455) to exchange JSON
+    messages with Chromium, so that no WebSocket library or web driver is needed.
+    Like all devtools requests, commands are handled on the Qt main thread, so the
+    client needs to be used from a different thread.
+    """
+
+    def __init__(self, web_socket_debugger_url: str, timeout: float = 5.0):
+        self._url = urlparse(web_socket_debugger_url)
+        self._timeout = timeout
+        self._socket: Optional[socket.socket] = None
+        self._buffer = b""
+        self._message_id = 0
+
+    def __enter__(self) -> "CDPClient":
+        self.connect()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def connect(self):
+        if self._url.hostname is None or self._url.port is None:
+            raise AnkiSessionError(f"Invalid devtools URL '{self._url.geturl()}'")
+
+        self._socket = socket.create_connection(
+            (self._url.hostname, self._url.port), timeout=self._timeout
+        )
+
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        handshake = (
+            f"GET {self._url.path} HTTP/1.1\r\n"
+            f"Host: {self._url.hostname}:{self._url.port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+            "\r\n"
+        )
+        self._socket.sendall(handshake.encode("ascii"))
+
+        while b"\r\n\r\n" not in self._buffer:
+            self._buffer += self._receive()
+
+        response, self._buffer = self._buffer.split(b"\r\n\r\n", 1)
+        status_line = response.split(b"\r\n", 1)[0].decode("ascii", "replace")
+
+        if " 101 " not in f"{status_line} ":
+            self.close()
+            raise AnkiSessionError(f"Could not connect to devtools: {status_line}")
+
+    def close(self):
+        if self._socket is None:
+            return
+        try:
+            self._send_frame(_OPCODE_CLOSE, b"")
+        except OSError:
+            pass
+        self._socket.close()
+        self._socket = None
+
+    def send(self, method: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Send command to the devtools target and return its result. Events
+        received in the meantime are discarded."""
+        self._message_id += 1
+        message_id = self._message_id
+
+        message = {"id": message_id, "method": method, "params": params or {}}
+        self._send_frame(_OPCODE_TEXT, json.dumps(message).encode("utf-8"))
+
+        while True:
+            response = json.loads(self._receive_message())
+            if response.get("id") != message_id:
+                continue
+            if "error" in response:
+                raise AnkiSessionError(
+                    f"Devtools command {method} failed: {response['error']}"
+                )
+            return response.get("result", {})
+
+    def _receive(self) -> bytes:
+        if self._socket is None:
+            raise AnkiSessionError("Devtools client is not connected")
+        if not (data := self._socket.recv(65536)):
+            raise AnkiSessionError("Devtools connection closed unexpectedly")
+        return data
+
+    def _receive_exactly(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            self._buffer += self._receive()
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _receive_message(self) -> str:
+        fragments = []
+
+        while True:
+            first_byte, second_byte = self._receive_exactly(2)
+            final = bool(first_byte & 0x80)
+            opcode = first_byte & 0x0F
+            length = second_byte & 0x7F
+
+            if length == 126:
+                (length,) = struct.unpack("!H", self._receive_exactly(2))
+            elif length == 127:
+                (length,) = struct.unpack("!Q", self._receive_exactly(8))
+
+            # Servers do not mask their frames, but handle it anyway
+            mask = self._receive_exactly(4) if second_byte & 0x80 else None
+            payload = self._receive_exactly(length)
+            if mask:
+                payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+            if opcode == _OPCODE_PING:
+                self._send_frame(_OPCODE_PONG, payload)
+                continue
+            if opcode == _OPCODE_CLOSE:
+                raise AnkiSessionError("Devtools connection closed by target")
+            if opcode in (_OPCODE_TEXT, _OPCODE_CONTINUATION):
+                fragments.append(payload)
+                if final:
+                    return b"".join(fragments).decode("utf-8")
+
+    def _send_frame(self, opcode: int, payload: bytes):
+        if self._socket is None:
+            raise AnkiSessionError("Devtools client is not connected")
+
+        # Clients need to mask all frames they send
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < 2**16:
+            header += bytes([0x80 | 126]) + struct.pack("!H", length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", length)
+
+        mask = os.urandom(4)
+        masked_payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+        self._socket.sendall(header + mask + masked_payload)
@@ -0,0 +1,165 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Tuple
+
+from ._durability import relax_collection_durability
+from ._errors import AnkiSessionError
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+
+MediaManifest = Dict[str, Tuple[int, int]]  # file name: (size, mtime_ns)
+
+
+def get_db_paths(collection: "Collection") -> Tuple[str, str]:
+    """Get paths to the collection database and its media database"""
+    return (collection.path, collection.path.replace(".anki2", ".media.db2"))
+
+
+def _remove_sqlite_sidecar_files(db_path: str):
+    for suffix in ("-wal", "-shm", "-journal"):
+        sidecar_path = db_path + suffix
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+
+
+def restore_db_file(snapshot_path: str, db_path: str):
+    """Replace the database file of a closed collection with a snapshot copy"""
+    shutil.copy2(snapshot_path, db_path)
+    _remove_sqlite_sidecar_files(db_path)
+
+
+def create_media_manifest(media_dir: str, backup_dir: str) -> MediaManifest:
+    """Record all files currently in the media folder, hard-linking them into
+    a backup folder so that files removed later on can be restored"""
+    manifest: MediaManifest = {}
+
+    with os.scandir(media_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            manifest[entry.name] = (stat.st_size, stat.st_mtime_ns)
+            backup_path = os.path.join(backup_dir, entry.name)
+            try:
+                os.link(entry.path, backup_path)
+            except OSError:  # e.g. backup folder on a different file system
+                shutil.copy2(entry.path, backup_path)
+
+    return manifest
+
+
+def restore_media_manifest(media_dir: str, backup_dir: str, manifest: MediaManifest):
+    """Return the media folder to the state recorded by create_media_manifest
+
+    Files added in the meantime are removed, and removed files are restored
+    from the backup. Like Anki itself, this assumes that media files are never
+    modified in place.
+    """
+    with os.scandir(media_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name not in manifest:
+                os.remove(entry.path)
+
+    for name in manifest:
+        media_path = os.path.join(media_dir, name)
+        if not os.path.exists(media_path):
+            shutil.copy2(os.path.join(backup_dir, name), media_path)
+
+
+@contextmanager
+def collection_closed(collection: "Collection", save: bool = True) -> Iterator[None]:
+    """Context manager that closes the collection, e.g. in order to copy its
+    database files, and reopens it upon context exit
+
+    Relaxed durability settings are lost when the database connection is
+    closed, so they are reapplied if they were active before.
+    """
+    db = collection.db
+    relaxed_durability = db is not None and db.scalar("pragma synchronous") == 0
+
+    collection.close(save=save, downgrade=False)
+
+    try:
+        yield
+    finally:
+        collection.reopen()
+        if relaxed_durability:
+            relax_collection_durability(collection)
+
+
+@contextmanager
+def collection_rolled_back(collection: "Collection") -> Iterator[None]:
+    """Context manager that snapshots the collection database and media folder,
+    rolling both back to the snapshot upon context exit.
+
+    The collection is briefly closed and reopened in order to take and restore
+    the snapshot, so the same Collection instance remains valid throughout.
+    """
+    if (media_dir := collection.media.dir()) is None:
+        raise AnkiSessionError("Collection media folder could not be determined")
+
+    db_paths = get_db_paths(collection)
+
+    with tempfile.TemporaryDirectory(prefix="pytest_anki_checkpoint_") as snapshot_dir:
+        media_backup_dir = Path(snapshot_dir) / "media"
+        media_backup_dir.mkdir()
+
+        snapshot_paths = []
+        with collection_closed(collection):
+            for index, db_path in enumerate(db_paths):
+                snapshot_path = os.path.join(snapshot_dir, f"{index}.db")
+                if os.path.exists(db_path):
+                    shutil.copy2(db_path, snapshot_path)
+                snapshot_paths.append(snapshot_path)
+
+        media_manifest = create_media_manifest(
+            media_dir=media_dir, backup_dir=str(media_backup_dir)
+        )
+
+        try:
+            yield
+        finally:
+            with collection_closed(collection, save=False):
+                for db_path, snapshot_path in zip(db_paths, snapshot_paths):
+                    if os.path.exists(snapshot_path):
+                        restore_db_file(snapshot_path=snapshot_path, db_path=db_path)
+
+            restore_media_manifest(
+                media_dir=media_dir,
+                backup_dir=str(media_backup_dir),
+                manifest=media_manifest,
+            )
@@ -0,0 +1,363 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
+from unittest import mock
+
+from anki.importing import apkg
+from anki.importing.apkg import AnkiPackageImporter
+
+from ._anki import get_anki_version
+from ._cache import mark_used
+from ._collection import collection_closed, get_db_paths, restore_db_file
+from ._types import PathLike
+from ._util import create_json, hash_file, move_into_place
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+
+
+class _ExtractedPackage:
+    """Stand-in for the zipfile.ZipFile object used by AnkiPackageImporter,
+    serving package members from an already extracted package folder"""
+
+    def __init__(self, path: PathLike):
+        self._path = Path(path)
+
+    def getinfo(self, name: str) -> str:
+        if not (self._path / name).is_file():
+            raise KeyError(name)
+        return name
+
+    def read(self, name: str) -> bytes:
+        return (self._path / name).read_bytes()
+
+
+def get_extracted_package(cache_dir: PathLike, package_path: PathLike) -> Path:
+    """Get path to the extracted contents of an .apkg file, extracting it first
+    if it has not been cached yet.
+
+    Cache entries are keyed by the package contents and the Anki version, so
+    that changes to either result in a fresh extraction.
+    """
+    package_key = f"{hash_file(package_path)}-{get_anki_version()}"
+    package_root = Path(cache_dir) / "decks"
+    extracted_path = package_root / package_key
+
+    if extracted_path.is_dir():
+        mark_used(extracted_path)
+        return extracted_path
+
+    package_root.mkdir(parents=True, exist_ok=True)
+    staging_path = tempfile.mkdtemp(prefix=f".{package_key}_", dir=package_root)
+
+    with zipfile.ZipFile(package_path) as package_file:
+        package_file.extractall(staging_path)
+
+    move_into_place(staging_path=staging_path, target_path=extracted_path)
+
+    return extracted_path
+
+
+def get_deck_ids(collection: "Collection") -> List[int]:
+    """Get IDs of all decks in the collection, ordered by deck name so that
+    parent decks precede their subdecks"""
+    try:  # 2.1.28+
+        return [int(deck.id) for deck in collection.decks.all_names_and_ids()]
+    except AttributeError:  # legacy
+        decks = sorted(collection.decks.all(), key=lambda deck: deck["name"])
+        return [int(deck["id"]) for deck in decks]
+
+
+def import_deck_package(
+    collection: "Collection", path: PathLike, cache_dir: Optional[PathLike] = None
+) -> List[int]:
+    """Import .apkg file into collection, reusing previously extracted package
+    contents if a cache folder is provided.
+
+    Returns IDs of all decks the imported cards were placed in, including
+    pre-existing ones, with parent decks preceding their subdecks.
+    """
+    if cache_dir is None:
+        importer = AnkiPackageImporter(col=collection, file=str(path))
+        importer.run()
+    else:
+        extracted_path = get_extracted_package(cache_dir=cache_dir, package_path=path)
+        importer = AnkiPackageImporter(col=collection, file=str(extracted_path))
+
+        # The importer still merges notes, cards, and media into the collection
+        # as usual, but reads package members from the cache rather than the
+        # archive
+        with mock.patch.object(
+            apkg, "zipfile", SimpleNamespace(ZipFile=_ExtractedPackage)
+        ):
+            importer.run()
+
+    # The importer maps each deck of the package to its local counterpart,
+    # creating parent decks before their children. Deck IDs are strings
+    # on <=2.1.26.
+    imported_deck_ids = getattr(importer, "_decks", None)
+    if imported_deck_ids is None:  # importers without a deck mapping
+        return get_deck_ids(collection)
+    return [int(deck_id) for deck_id in imported_deck_ids.values()]
+
+
+@contextmanager
+def _collection_commits_deferred(collection: "Collection") -> Iterator[None]:
+    """Skip the commit and database optimization that the importer performs
+    after each package, committing all changes once upon context completion"""
+    save = collection.save
+
+    with ExitStack() as stack:
+        for name in ("save", "optimize"):
+            stack.enter_context(
+                mock.patch.object(collection, name, lambda *args, **kwargs: None)
+            )
+        yield
+
+    save()
+
+
+def _import_deck_packages(
+    collection: "Collection",
+    paths: List[PathLike],
+    existing_deck_ids: Iterable[int],
+    cache_dir: Optional[PathLike],
+) -> Dict[PathLike, List[int]]:
+    known_deck_ids = {int(deck_id) for deck_id in existing_deck_ids}
+    created_deck_ids: Dict[PathLike, List[int]] = {}
+
+    with _collection_commits_deferred(collection):
+        for path in paths:
+            deck_ids = created_deck_ids.setdefault(path, [])
+            for deck_id in import_deck_package(
+                collection=collection, path=path, cache_dir=cache_dir
+            ):
+                if deck_id not in known_deck_ids:
+                    known_deck_ids.add(deck_id)
+                    deck_ids.append(deck_id)
+
+    return created_deck_ids
+
+
+# Collection snapshots
+
+_SNAPSHOT_DECKS_FILE = "decks.json"
+
+# Columns recording when and whether rows were modified or synced, which differ
+# between otherwise identical collections
+_VOLATILE_COLUMNS = ("mod", "mtime_secs", "usn", "ls")
+
+
+def _get_pristine_state_hash(collection: "Collection", media_dir: str) -> Optional[str]:
+    """Get hash of the contents of a collection that is still in the state it
+    was created in, i.e. one that holds no notes, cards, review history,
+    deletion records, or media files. Returns None for any other collection.
+
+    Collections cloned from the same base directory template on the same day
+    share this hash, even if Anki touched their configuration while loading
+    them.
+    """
+    db = collection.db
+    if db is None or db.scalar(
+        "select exists(select 1 from notes) or exists(select 1 from cards)"
+        " or exists(select 1 from revlog) or exists(select 1 from graves)"
+    ):
+        return None
+
+    with os.scandir(media_dir) as entries:
+        if any(entry.is_file() for entry in entries):
+            return None
+
+    state_hash = hashlib.sha256()
+
+    for (table,) in db.all(
+        "select name from sqlite_master where type = 'table'"
+        " and name not like 'sqlite_%' order by name"
+    ):
+        columns = [
+            column
+            for _, column, *_ in db.all(f"pragma table_info({table})")
+            if column not in _VOLATILE_COLUMNS
+        ]
+        rows = db.all(f"select {', '.join(columns)} from {table}")
+        state_hash.update(f"{table}:{columns}".encode())
+        for row in sorted(repr(row) for row in rows):
+            state_hash.update(row.encode())
+
+    return state_hash.hexdigest()
+
+
+def _get_snapshot_key(pristine_state_hash: str, paths: List[PathLike]) -> str:
+    """Get key identifying the result of importing the specified packages into
+    a pristine collection"""
+    snapshot_hash = hashlib.sha256(
+        f"{get_anki_version()}|{pristine_state_hash}".encode()
+    )
+    for path in paths:
+        snapshot_hash.update(hash_file(path).encode())
+    return snapshot_hash.hexdigest()
+
+
+def _link_or_copy(source_path: str, target_path: str):
+    try:
+        os.link(source_path, target_path)
+    except OSError:  # e.g. cache folder on a different file system
+        shutil.copy2(source_path, target_path)
+
+
+def _restore_snapshot(
+    collection: "Collection", media_dir: str, snapshot_path: Path
+) -> List[List[int]]:
+    """Restore the (closed) collection from a snapshot, returning the IDs of the
+    decks created by each package"""
+    for index, db_path in enumerate(get_db_paths(collection)):
+        db_snapshot_path = snapshot_path / f"{index}.db"
+        if db_snapshot_path.is_file():
+            restore_db_file(snapshot_path=str(db_snapshot_path), db_path=db_path)
+
+    with os.scandir(snapshot_path / "media") as entries:
+        for entry in entries:
+            _link_or_copy(entry.path, os.path.join(media_dir, entry.name))
+
+    mark_used(snapshot_path)
+
+    return json.loads((snapshot_path / _SNAPSHOT_DECKS_FILE).read_text())["deck_ids"]
+
+
+def _create_snapshot(
+    collection: "Collection",
+    media_dir: str,
+    deck_ids: List[List[int]],
+    snapshot_path: Path,
+):
+    """Store the state of the (closed) collection and its media folder as a
+    snapshot"""
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    staging_path = Path(
+        tempfile.mkdtemp(prefix=f".{snapshot_path.name}_", dir=snapshot_path.parent)
+    )
+
+    for index, db_path in enumerate(get_db_paths(collection)):
+        if os.path.exists(db_path):
+            shutil.copy2(db_path, staging_path / f"{index}.db")
+
+    media_staging_path = staging_path / "media"
+    media_staging_path.mkdir()
+
+    with os.scandir(media_dir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                _link_or_copy(entry.path, str(media_staging_path / entry.name))
+
+    create_json(staging_path / _SNAPSHOT_DECKS_FILE, {"deck_ids": deck_ids})
+
+    move_into_place(staging_path=staging_path, target_path=snapshot_path)
+
+
+def import_deck_packages(
+    collection: "Collection",
+    paths: Iterable[PathLike],
+    existing_deck_ids: Iterable[int],
+    cache_dir: Optional[PathLike] = None,
+    snapshot_pristine: bool = False,
+) -> Dict[PathLike, List[int]]:
+    """Import multiple .apkg files into collection within a single transaction.
+
+    Returns a mapping of each package path to the IDs of the decks that were
+    created by importing it, top-level decks first. Decks that already existed
+    beforehand (as per existing_deck_ids) or that were created by an earlier
+    package are not included.
+
+    snapshot_pristine marks collections whose pristine state recurs, e.g.
+    because they were cloned from a base directory template. If such a
+    collection is still pristine (see _get_pristine_state_hash) and a cache
+    folder is provided, the resulting collection and media state is stored as a
+    snapshot. Later imports of the same packages into a pristine collection
+    with the same contents, e.g. in the freshly cloned profile of another
+    session, restore that snapshot via plain file copies instead of running the
+    importer again. Imports into any other collection skip snapshots
+    altogether.
+    """
+    paths = list(paths)
+    import_packages = partial(
+        _import_deck_packages,
+        collection=collection,
+        paths=paths,
+        existing_deck_ids=existing_deck_ids,
+        cache_dir=cache_dir,
+    )
+
+    if (
+        not snapshot_pristine
+        or cache_dir is None
+        or (media_dir := collection.media.dir()) is None
+    ):
+        return import_packages()
+
+    pristine_state_hash = _get_pristine_state_hash(
+        collection=collection, media_dir=media_dir
+    )
+    if pristine_state_hash is None:
+        return import_packages()
+
+    snapshot_key = _get_snapshot_key(
+        pristine_state_hash=pristine_state_hash, paths=paths
+    )
+    snapshot_path = Path(cache_dir) / "snapshots" / snapshot_key
+
+    if snapshot_path.is_dir():
+        with collection_closed(collection):
+            deck_ids = _restore_snapshot(
+                collection=collection, media_dir=media_dir, snapshot_path=snapshot_path
+            )
+        return dict(zip(paths, deck_ids))
+
+    created_deck_ids = import_packages()
+
+    with collection_closed(collection):
+        _create_snapshot(
+            collection=collection,
+            media_dir=media_dir,
+            deck_ids=[created_deck_ids[path] for path in paths],
+            snapshot_path=snapshot_path,
+        )
+
+    return created_deck_ids
@@ -0,0 +1,145 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import dataclasses
+import hashlib
+import json
+import math
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from xdist.scheduler import LoadScopeScheduling
+
+from ._types import PathLike
+
+if TYPE_CHECKING:
+    from _pytest.config import Config  # FIXME: not stable
+    from pytest import Item
+
+
+def get_session_config_key(item: "Item") -> Optional[str]:
+    """Get key identifying the Anki session configuration used by a test, if any
+
+    Function-scoped sessions are keyed by their canonicalized parameters, module-
+    scoped sessions by their module.
+    """
+    fixture_names = getattr(item, "fixturenames", ())
+
+    if "anki_session" in fixture_names:
+        callspec = getattr(item, "callspec", None)
+        parameters = callspec.params.get("anki_session") if callspec else None
+        configuration = {
+            "parameters": _canonicalize(parameters or {}),
+            "web_debugging": item.get_closest_marker("anki_web_debugging") is not None,
+        }
+        digest = hashlib.sha1(
+            json.dumps(configuration, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return f"anki_session:{digest[:12]}"
+
+    if "anki_session_module" in fixture_names:
+        return f"anki_session_module:{item.nodeid.split('::')[0]}"
+
+    return None
+
+
+def _canonicalize(value: Any) -> Any:
+    """Convert fixture parameters to a JSON-serializable form that is identical
+    for identical configurations"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _canonicalize(dataclasses.asdict(value))
+    if isinstance(value, dict):
+        return {str(key): _canonicalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(item) for item in value]
+    if isinstance(value, Enum):
+        return value.value
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)  # e.g. paths
+
+
+def write_session_config_keys(keys_dir: PathLike, worker_id: str, items: List["Item"]):
+    """Publish the session config keys of the collected tests for the scheduler"""
+    keys = {
+        item.nodeid: key
+        for item in items
+        if (key := get_session_config_key(item)) is not None
+    }
+    staging_path = Path(keys_dir) / f".{worker_id}.json"
+    staging_path.write_text(json.dumps(keys), encoding="utf-8")
+    staging_path.rename(Path(keys_dir) / f"{worker_id}.json")
+
+
+class AnkiConfigScheduling(LoadScopeScheduling):
+
+    """
+    Distributes tests across pytest-xdist workers so that tests which launch Anki
+    with identical session configurations run on the same worker, where they
+    share cached base directory templates and other set-up artifacts.
+
+    To keep workers busy, large groups are split into chunks of at most
+    len(tests) / len(workers) tests. Tests without an Anki session are
+    distributed freely.
+    """
+
+    def __init__(self, config: "Config", log=None, keys_dir: PathLike = ""):
+        super().__init__(config, log)
+        self._keys_dir = Path(keys_dir)
+        self._scopes: Optional[Dict[str, str]] = None
+
+    def _split_scope(self, nodeid: str) -> str:
+        if self._scopes is None:
+            self._scopes = self._get_scopes()
+        return self._scopes.get(nodeid, nodeid)
+
+    def _get_scopes(self) -> Dict[str, str]:
+        # Workers publish their keys before reporting their collection, so all
+        # keys are available by the time tests are scheduled
+        keys: Dict[str, str] = {}
+        for keys_path in self._keys_dir.glob("*.json"):
+            if not keys_path.name.startswith("."):
+                keys.update(json.loads(keys_path.read_text(encoding="utf-8")))
+
+        collection = self.collection or []
+        chunk_size = max(1, math.ceil(len(collection) / max(1, self.numnodes)))
+
+        scopes: Dict[str, str] = {}
+        group_sizes: Dict[str, int] = {}
+
+        for nodeid in collection:
+            if (key := keys.get(nodeid)) is None:
+                continue
+            group_size = group_sizes.get(key, 0)
+            scopes[nodeid] = f"{key}#{group_size // chunk_size}"
+            group_sizes[key] = group_size + 1
+
+        return scopes
@@ -0,0 +1,73 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+"""
+Relaxed durability settings for test databases
+"""
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+    from aqt.profiles import ProfileManager
+
+# Test databases never need to survive a crash, so we skip syncing writes to
+# disk and keep the rollback journal in memory
+_EPHEMERAL_PRAGMAS = ("pragma synchronous = off", "pragma journal_mode = memory")
+
+
+def _execute_pragmas(db: Any):
+    for pragma in _EPHEMERAL_PRAGMAS:
+        db.execute(pragma)
+
+
+def relax_collection_durability(collection: "Collection"):
+    """Apply ephemeral SQLite settings to the collection database for as long
+    as it remains open"""
+    if (db := collection.db) is None:
+        return
+
+    try:
+        _execute_pragmas(db)
+    except Exception:
+        # Anki <=2.1.49 keeps a transaction open at all times, within which
+        # these settings cannot be changed
+        collection.save(trx=False)
+        _execute_pragmas(db)
+        db.begin()
+
+
+def relax_profile_durability(profile_manager: "ProfileManager"):
+    """Apply ephemeral SQLite settings to the profile database (prefs21.db)"""
+    if (db := profile_manager.db) is None:
+        return
+
+    db.commit()
+    _execute_pragmas(db)
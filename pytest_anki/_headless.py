@@ -0,0 +1,125 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+"""
+Collections opened without launching Anki's GUI
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from ._addons import create_addon_config
+from ._anki import AnkiStateUpdate, update_collection_config
+from ._durability import relax_collection_durability
+from ._errors import AnkiSessionError
+from ._util import base_directory
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+
+
+@contextmanager
+def collection_opened(
+    base_path: str = tempfile.gettempdir(),
+    base_name: str = "anki_base",
+    profile_name: str = "User 1",
+    preset_anki_state: Optional[AnkiStateUpdate] = None,
+    addon_configs: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+    ephemeral: bool = False,
+) -> Iterator["Collection"]:
+    """Context manager that creates an Anki base folder with a fresh collection
+    and opens it through Anki's backend only, i.e. without importing aqt or
+    creating a QApplication. Cleans up after itself.
+
+    Keyword Arguments:
+        base_path {str} -- Path to write Anki base folder to
+            (default: system-wide temporary directory)
+
+        base_name {str} -- Base folder name (default: {"anki_base"})
+
+        profile_name {str} -- Name of the profile folder holding the collection
+            (default: {"User 1"})
+
+        preset_anki_state {Optional[pytest_anki.AnkiStateUpdate]}:
+            Collection config (colconf_storage) to apply after opening the
+            collection. profile_storage and meta_storage require Anki's profile
+            manager and are therefore not supported.
+
+        addon_configs {Optional[List[Tuple[str, Dict[str, Any]]]]}:
+            List of add-on package names and user config values to write to the
+            add-ons' meta.json files in the base folder
+
+        ephemeral {bool}:
+            Whether to trade crash safety for speed by turning off syncing writes
+            to disk and journaling to disk for the collection database
+            (default: {False})
+
+    Yields:
+        Iterator[Collection] -- Opened collection
+    """
+    if preset_anki_state and (
+        preset_anki_state.profile_storage or preset_anki_state.meta_storage
+    ):
+        raise AnkiSessionError(
+            "Only colconf_storage can be preset without launching Anki's GUI"
+        )
+
+    from anki.collection import Collection
+
+    with base_directory(base_path=base_path, base_name=base_name) as anki_base_dir:
+
+        for package_name, config_values in addon_configs or []:
+            create_addon_config(
+                anki_base_dir=anki_base_dir,
+                package_name=package_name,
+                user_config=config_values,
+            )
+
+        # Mirror the folder layout of a regular Anki profile
+        profile_folder = os.path.join(anki_base_dir, profile_name)
+        os.mkdir(profile_folder)
+
+        collection = Collection(os.path.join(profile_folder, "collection.anki2"))
+
+        try:
+            if ephemeral:
+                relax_collection_durability(collection)
+
+            if preset_anki_state and preset_anki_state.colconf_storage:
+                update_collection_config(
+                    collection=collection, data=preset_anki_state.colconf_storage
+                )
+
+            yield collection
+        finally:
+            if collection.db is not None:
+                collection.close()
@@ -30,26 +30,49 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+import hashlib
 import os
 import shutil
 import tempfile
+import time
 from contextlib import contextmanager, nullcontext
-from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 from unittest import mock
 
 from PyQt5.QtCore import qInstallMessageHandler
 
-from ._anki import AnkiStateUpdate, update_anki_colconf_state, update_anki_profile_state
+from ._addons import AddonLoadReport
+from ._anki import (
+    AnkiStateUpdate,
+    get_anki_version,
+    update_anki_colconf_state,
+    update_anki_profile_state,
+)
+from ._cache import mark_used
+from ._durability import relax_collection_durability, relax_profile_durability
 from ._errors import AnkiSessionError
 from ._patch import (
     patch_anki,
     post_ui_setup_callback_factory,
     set_qt_message_handler_installer,
 )
+from ._ports import reserved_port
 from ._qt import QtMessageMatcher
 from ._session import AnkiSession
-from ._types import PathLike
-from ._util import find_free_port
+from ._timing import PhaseTimer
+from ._types import AddonInstallMode, PathLike
+from ._util import base_directory, move_into_place
+from ._webdriver import ChromeDriverPool
+from ._webviews import WebViewRegistry
 
 if TYPE_CHECKING:
     from pytestqt.qtbot import QtBot
@@ -82,13 +105,60 @@ def temporary_user(anki_base_dir: str, name: str, lang: str) -> Iterator[str]:
         pm.db.commit()
 
 
-@contextmanager
-def base_directory(base_path: str, base_name: str) -> Iterator[str]:
-    if not os.path.isdir(base_path):
-        os.mkdir(base_path)
-    anki_base_dir = tempfile.mkdtemp(prefix=f"{base_name}_", dir=base_path)
-    yield anki_base_dir
-    shutil.rmtree(anki_base_dir, ignore_errors=True)
+# Anki starts new scheduler days at 4am by default
+_DAY_ROLLOVER_HOUR = 4
+
+
+def _get_scheduler_day() -> str:
+    return time.strftime(
+        "%Y-%m-%d", time.localtime(time.time() - _DAY_ROLLOVER_HOUR * 60 * 60)
+    )
+
+
+def get_base_directory_template(cache_dir: str, profile_name: str, lang: str) -> str:
+    """Get path to a pre-built Anki base directory containing a user profile
+    with the specified name and language, as well as its empty collection,
+    building the template if necessary.
+
+    Templates are assembled in a staging folder and then moved into place, so
+    that test processes sharing the same template root never see a partially
+    written template. As the creation date of the collection determines the
+    scheduler's notion of the current day, templates are only reused on the
+    day they were built on.
+    """
+    from anki.collection import Collection
+    from aqt.profiles import ProfileManager
+
+    day = _get_scheduler_day()
+    template_key = hashlib.sha1(
+        f"{get_anki_version()}|{profile_name}|{lang}|{day}".encode("utf-8")
+    ).hexdigest()
+    template_root = os.path.join(cache_dir, "templates")
+    template_path = os.path.join(template_root, template_key)
+
+    if os.path.isdir(template_path):
+        mark_used(template_path)
+        return template_path
+
+    os.makedirs(template_root, exist_ok=True)
+    staging_path = tempfile.mkdtemp(prefix=f".{template_key}_", dir=template_root)
+
+    pm = ProfileManager(base=staging_path)
+
+    pm.setupMeta()
+    pm.setLang(lang)
+    pm.create(profile_name)
+
+    if pm.db:
+        pm.db.close()
+
+    pm.name = profile_name
+    collection = Collection(pm.collectionPath())
+    collection.close(downgrade=False)
+
+    move_into_place(staging_path=staging_path, target_path=template_path)
+
+    return template_path
 
 
 @contextmanager
@@ -105,6 +175,10 @@ def anki_running(
     addon_configs: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
     enable_web_debugging: bool = True,
     skip_loading_addons: bool = False,
+    cache_dir: Optional[str] = None,
+    unpacked_addons_install_mode: AddonInstallMode = AddonInstallMode.copy,
+    chrome_driver_pool: Optional[ChromeDriverPool] = None,
+    ephemeral: bool = False,
 ) -> Iterator[AnkiSession]:
     """Context manager that safely launches an Anki session, cleaning up after itself
 
@@ -154,14 +228,39 @@ def anki_running(
             Each list member needs to be specified as a tuple of add-on package name
             and dictionary of user configuration values to set.
 
-        web_debugging_port {Optional[int]}:
-            If specified, launches Anki with QTWEBENGINE_REMOTE_DEBUGGING set, allowing
-            you to remotely debug Qt web engine views.
+        enable_web_debugging {bool}:
+            Whether to launch Anki with QTWEBENGINE_REMOTE_DEBUGGING set, allowing
+            you to remotely debug Qt web engine views (default: {True})
 
         skip_loading_addons {bool}:
             If set to True, will skip loading packed and unpacked add-ons, giving the
             caller full control over the add-on import time.
 
+        cache_dir {Optional[str]}:
+            Path to a folder for caching expensive set-up steps across sessions.
+            If specified, the Anki base directory is cloned from a cached template
+            matching profile_name and lang instead of being set up from scratch,
+            and deck packages installed via the session are only extracted once.
+
+        unpacked_addons_install_mode {pytest_anki.AddonInstallMode}:
+            How to install unpacked_addons (default: {AddonInstallMode.copy}).
+            AddonInstallMode.symlink links to the add-on source files instead of
+            copying them, sharing their bytecode cache across sessions.
+            AddonInstallMode.cache does the same for a copy of the add-on folder
+            that is kept in cache_dir and keyed by its contents, leaving the
+            source folder untouched.
+
+        chrome_driver_pool {Optional[pytest_anki._webdriver.ChromeDriverPool]}:
+            Long-lived chromedriver service to attach web drivers to, e.g. one
+            shared by all sessions of a test run. If not specified, the session
+            starts and stops its own chromedriver service.
+
+        ephemeral {bool}:
+            Whether to trade crash safety for speed by turning off syncing writes
+            to disk and journaling to disk for the collection and profile
+            databases, and by skipping the automatic collection backup on
+            profile unload on Anki 2.1.49 and below (default: {False})
+
     Returns:
         Iterator[AnkiSession] -- [description]
 
@@ -172,7 +271,25 @@ def anki_running(
     import aqt
     from aqt import gui_hooks
 
-    with base_directory(base_path=base_path, base_name=base_name) as anki_base_dir:
+    phase_timer = PhaseTimer()
+    addon_load_reports: List[AddonLoadReport] = []
+
+    base_directory_started_at = time.perf_counter()
+
+    if cache_dir:
+        template_path: Optional[str] = get_base_directory_template(
+            cache_dir=cache_dir, profile_name=profile_name, lang=lang
+        )
+    else:
+        template_path = None
+
+    with base_directory(
+        base_path=base_path, base_name=base_name, template_path=template_path
+    ) as anki_base_dir:
+
+        phase_timer.record(
+            "base_directory", time.perf_counter() - base_directory_started_at
+        )
 
         # Callback to run between main UI initialization and finishing steps of UI
         # initialization (add-on loading time)
@@ -184,6 +301,10 @@ def anki_running(
             addon_configs=addon_configs,
             preset_anki_state=preset_anki_state,
             skip_loading_addons=skip_loading_addons,
+            phase_timer=phase_timer,
+            addon_load_reports=addon_load_reports,
+            unpacked_addons_install_mode=unpacked_addons_install_mode,
+            cache_dir=cache_dir,
         )
 
         # Apply preset Anki profile and collection.conf storage on profile load
@@ -206,22 +327,55 @@ def anki_running(
         else:
             profile_hooked = False
 
+        # Relax durability of the collection database whenever it is (re)opened
+
+        if ephemeral:
+            gui_hooks.collection_did_load.append(relax_collection_durability)
+
         # Start Anki session
 
-        with patch_anki(post_ui_setup_callback=post_ui_setup_callback):
-            with temporary_user(
-                anki_base_dir=anki_base_dir, name=profile_name, lang=lang
-            ) as user_name:
+        patch_anki_started_at = time.perf_counter()
+
+        web_view_registry = WebViewRegistry(observe_long_tasks=enable_web_debugging)
+
+        with patch_anki(
+            post_ui_setup_callback=post_ui_setup_callback,
+            phase_timer=phase_timer,
+            web_view_registry=web_view_registry,
+        ):
+            phase_timer.record(
+                "patch_anki", time.perf_counter() - patch_anki_started_at
+            )
+
+            # Profiles cloned from a template are removed along with the base dir
+            user_context: ContextManager[str]
+            if template_path:
+                user_context = nullcontext(profile_name)
+            else:
+                user_context = temporary_user(
+                    anki_base_dir=anki_base_dir, name=profile_name, lang=lang
+                )
+
+            # Remote debugging ports are held for the entire session
+            port_reservation: ContextManager[Optional[int]]
+            if enable_web_debugging:
+                port_reservation = reserved_port()
+            else:
+                port_reservation = nullcontext()
+
+            profile_creation_started_at = time.perf_counter()
+
+            with user_context as user_name, port_reservation as web_debugging_port:
+
+                phase_timer.record(
+                    "profile_creation",
+                    time.perf_counter() - profile_creation_started_at,
+                )
 
                 environment = {}
 
-                if enable_web_debugging:
-                    web_debugging_port = find_free_port()
-                    if web_debugging_port is None:
-                        raise OSError("Could not find a free port for remote debugging")
+                if web_debugging_port is not None:
                     environment[QTWEBENGINE_REMOTE_DEBUGGING] = str(web_debugging_port)
-                else:
-                    web_debugging_port = None
 
                 with mock.patch.dict(os.environ, environment):
 
@@ -261,13 +415,31 @@ def anki_running(
                         # availability at add-on init time for most users. Anki
                         # will automatically open the profile at mw.setupProfile
                         # time in single-profile setups
-                        app = aqt._run(argv=["anki", "-b", anki_base_dir], exec=False)
+                        with phase_timer.phase("aqt_run"):
+                            app = aqt._run(
+                                argv=["anki", "-b", anki_base_dir], exec=False
+                            )
+
+                        web_debugging_wait_started_at = time.perf_counter()
+
+                    if web_debugging_port is not None:
+                        phase_timer.record(
+                            "web_debugging_wait",
+                            time.perf_counter() - web_debugging_wait_started_at,
+                        )
 
                     mw = aqt.mw
 
                     if mw is None or app is None:
                         raise AnkiSessionError("Main window not initialized correctly")
 
+                    if ephemeral:
+                        relax_profile_durability(mw.pm)
+                        # Collection backups are written on profile unload by
+                        # mw.backup on <=2.1.49. Later versions create backups
+                        # through the backend instead, which is left untouched.
+                        setattr(mw, "backup", lambda *args, **kwargs: None)
+
                     anki_session = AnkiSession(
                         app=app,
                         mw=mw,
@@ -275,14 +447,27 @@ def anki_running(
                         base=anki_base_dir,
                         qtbot=qtbot,
                         web_debugging_port=web_debugging_port,
+                        cache_dir=cache_dir,
+                        cloned_from_template=template_path is not None,
+                        phase_timer=phase_timer,
+                        addon_load_reports=addon_load_reports,
+                        chrome_driver_pool=chrome_driver_pool,
+                        web_view_registry=web_view_registry,
                     )
 
                     if not load_profile:
                         yield anki_session
 
                     else:
-                        with anki_session.profile_loaded():
-                            yield anki_session
+                        with phase_timer.phase("profile_load"):
+                            anki_session.load_profile()
+
+                        yield anki_session
+
+                        with phase_timer.phase("profile_unload"):
+                            anki_session.unload_profile()
+
+                    anki_session.reset_chrome_driver()
 
                     # Undo monkey-patch if applied
                     set_qt_message_handler_installer(qInstallMessageHandler)
@@ -292,13 +477,17 @@ def anki_running(
 
     # clean up what was spoiled
     if aqt.mw:
-        aqt.mw.cleanupAndExit()
+        with phase_timer.phase("cleanup"):
+            aqt.mw.cleanupAndExit()
 
     # remove hooks added by pytest-anki
 
     if profile_hooked:
         gui_hooks.profile_did_open.remove(profile_loaded_callback)
 
+    if ephemeral:
+        gui_hooks.collection_did_load.remove(relax_collection_durability)
+
     # remove hooks added during app initialization
     from anki import hooks
 
@@ -0,0 +1,265 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+"""
+Creation of notes, note types, and decks from declarative specifications
+"""
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence
+
+from ._errors import AnkiSessionError
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+    from anki.models import NotetypeDict
+
+
+class TemplateSpec(NamedTuple):
+    """Card template of a NoteTypeSpec"""
+
+    name: str
+    front: str
+    back: str
+
+
+@dataclass
+class NoteTypeSpec:
+    """Note type to create, with its fields and card templates"""
+
+    name: str
+    fields: List[str]
+    templates: List[TemplateSpec]
+    css: Optional[str] = None
+
+
+@dataclass
+class NoteSpec:
+    """Note to create, with its field contents specified by field name.
+
+    The note type may either be one of the note types specified alongside the
+    note, or a note type that already exists in the collection. The deck is
+    created if it does not exist, yet.
+    """
+
+    note_type: str
+    fields: Dict[str, str]
+    deck: str = "Default"
+    tags: List[str] = field(default_factory=list)
+
+
+@dataclass
+class NotesSpec:
+    """Specifies notes to install into a collection, along with any note types
+    and (otherwise empty) decks they require"""
+
+    notes: List[NoteSpec] = field(default_factory=list)
+    note_types: List[NoteTypeSpec] = field(default_factory=list)
+    decks: List[str] = field(default_factory=list)
+
+
+@dataclass
+class InstalledNotes:
+    """IDs of the objects created by installing a NotesSpec
+
+    deck_ids and note_type_ids map the names of all decks and note types
+    referenced by the spec to their IDs, while created_deck_ids and
+    created_note_type_ids only list the ones that did not exist beforehand.
+    """
+
+    note_ids: List[int]
+    deck_ids: Dict[str, int]
+    note_type_ids: Dict[str, int]
+    created_deck_ids: List[int]
+    created_note_type_ids: List[int]
+
+
+def get_note_type(collection: "Collection", name: str) -> Optional["NotetypeDict"]:
+    try:  # 2.1.45+
+        return collection.models.by_name(name)
+    except AttributeError:  # legacy
+        return collection.models.byName(name)
+
+
+def add_note_type(collection: "Collection", spec: NoteTypeSpec) -> "NotetypeDict":
+    models = collection.models
+    note_type = models.new(spec.name)
+
+    for field_name in spec.fields:
+        try:  # 2.1.45+
+            models.add_field(note_type, models.new_field(field_name))
+        except AttributeError:  # legacy
+            models.addField(note_type, models.newField(field_name))
+
+    for template_spec in spec.templates:
+        try:  # 2.1.45+
+            template = models.new_template(template_spec.name)
+        except AttributeError:  # legacy
+            template = models.newTemplate(template_spec.name)
+        template["qfmt"] = template_spec.front
+        template["afmt"] = template_spec.back
+        try:  # 2.1.45+
+            models.add_template(note_type, template)
+        except AttributeError:  # legacy
+            models.addTemplate(note_type, template)
+
+    if spec.css is not None:
+        note_type["css"] = spec.css
+
+    models.add(note_type)
+
+    return note_type
+
+
+def _get_deck_ids(
+    collection: "Collection", names: Sequence[str]
+) -> Dict[str, Optional[int]]:
+    """Map deck names to IDs, with None marking decks that do not exist yet.
+    Parents of nested decks are included as well, as Anki creates them
+    implicitly."""
+    decks = collection.decks
+    deck_ids: Dict[str, Optional[int]] = {}
+
+    for name in names:
+        components = name.split("::")
+        for depth in range(1, len(components) + 1):
+            path = "::".join(components[:depth])
+            if path in deck_ids:
+                continue
+            deck_id = decks.id(path, create=False)
+            deck_ids[path] = int(deck_id) if deck_id else None
+
+    return deck_ids
+
+
+def install_notes(collection: "Collection", spec: NotesSpec) -> InstalledNotes:
+    """Create the notes, note types, and decks described by spec
+
+    Everything is created through the collection's own APIs and committed at
+    once, sidestepping the packaging and import steps of .apkg files.
+    """
+    note_types: Dict[str, "NotetypeDict"] = {}
+    created_note_type_ids: List[int] = []
+
+    for note_type_spec in spec.note_types:
+        note_type = add_note_type(collection, note_type_spec)
+        note_types[note_type_spec.name] = note_type
+        created_note_type_ids.append(int(note_type["id"]))
+
+    existing_deck_ids = _get_deck_ids(
+        collection, [*spec.decks, *(note.deck for note in spec.notes)]
+    )
+    deck_ids: Dict[str, int] = {}
+    created_deck_ids: List[int] = []
+
+    for name, existing_deck_id in existing_deck_ids.items():
+        if existing_deck_id is None:
+            deck_id = int(collection.decks.id(name))  # type: ignore[arg-type]
+            created_deck_ids.append(deck_id)
+        else:
+            deck_id = existing_deck_id
+        deck_ids[name] = deck_id
+
+    note_ids: List[int] = []
+
+    for note_spec in spec.notes:
+        if note_spec.note_type not in note_types:
+            existing_note_type = get_note_type(collection, note_spec.note_type)
+            if existing_note_type is None:
+                raise AnkiSessionError(f"Unknown note type: {note_spec.note_type}")
+            note_types[note_spec.note_type] = existing_note_type
+
+        note_type = note_types[note_spec.note_type]
+
+        deck_id = deck_ids[note_spec.deck]
+
+        try:  # 2.1.45+
+            note = collection.new_note(note_type)
+        except AttributeError:  # legacy
+            from anki.notes import Note
+
+            note = Note(collection, note_type)
+
+        for field_name, value in note_spec.fields.items():
+            note[field_name] = value
+        note.tags = list(note_spec.tags)
+
+        try:  # 2.1.45+
+            collection.add_note(note, deck_id)  # type: ignore[arg-type]
+        except AttributeError:  # legacy
+            note_type["did"] = deck_id
+            collection.addNote(note)
+
+        note_ids.append(int(note.id))
+
+    collection.save()
+
+    return InstalledNotes(
+        note_ids=note_ids,
+        deck_ids=deck_ids,
+        note_type_ids={
+            name: int(note_type["id"]) for name, note_type in note_types.items()
+        },
+        created_deck_ids=created_deck_ids,
+        created_note_type_ids=created_note_type_ids,
+    )
+
+
+def remove_installed_notes(collection: "Collection", installed: InstalledNotes):
+    """Remove notes created by install_notes, along with any decks and note
+    types created alongside them"""
+    try:  # 2.1.45+
+        collection.remove_notes(installed.note_ids)  # type: ignore[arg-type]
+    except AttributeError:  # legacy
+        collection.remNotes(installed.note_ids)
+
+    decks = collection.decks
+    try:  # 2.1.28+
+        decks.remove(installed.created_deck_ids)  # type: ignore[arg-type]
+    except AttributeError:  # legacy
+        for deck_id in installed.created_deck_ids:
+            decks.rem(deck_id, cardsToo=True)
+
+    if not installed.created_note_type_ids:
+        return
+
+    # Removing note types requires a full sync, which Anki would otherwise ask
+    # the user to confirm through a blocking dialog on some versions
+    try:  # 2.1.45+
+        collection.mod_schema(check=False)
+    except AttributeError:  # legacy
+        collection.modSchema(check=False)
+
+    models = collection.models
+    for note_type_id in installed.created_note_type_ids:
+        try:  # 2.1.28+
+            models.remove(note_type_id)  # type: ignore[arg-type]
+        except AttributeError:  # legacy
+            models.rem(models.get(note_type_id))  # type: ignore[arg-type]
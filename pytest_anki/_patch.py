@@ -49,12 +49,16 @@ if TYPE_CHECKING:
     from aqt.profiles import ProfileManager as ProfileManagerType
 
 from ._addons import (
+    AddonLoadReport,
+    addon_imports_profiled,
     create_addon_config,
     install_addon_from_folder,
     install_addon_from_package,
 )
 from ._anki import AnkiStateUpdate, update_anki_meta_state
-from ._types import PathLike
+from ._timing import PhaseTimer
+from ._types import AddonInstallMode, PathLike
+from ._webviews import WebViewRegistry
 
 PostUISetupCallbackType = Callable[[AnkiQt], None]
 
@@ -66,32 +70,44 @@ def post_ui_setup_callback_factory(
     addon_configs: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
     preset_anki_state: Optional[AnkiStateUpdate] = None,
     skip_loading_addons: bool = False,
+    phase_timer: Optional[PhaseTimer] = None,
+    addon_load_reports: Optional[List[AddonLoadReport]] = None,
+    unpacked_addons_install_mode: AddonInstallMode = AddonInstallMode.copy,
+    cache_dir: Optional[PathLike] = None,
 ):
+    timer = phase_timer or PhaseTimer()
+    reports = addon_load_reports if addon_load_reports is not None else []
+
     def post_ui_setup_callback(main_window: AnkiQt):
         """Initialize add-on manager, install add-ons, load add-ons"""
         main_window.addonManager = aqt.addons.AddonManager(main_window)
 
-        if packed_addons:
-            for packed_addon in packed_addons:
-                install_addon_from_package(
-                    addon_manager=main_window.addonManager, addon_path=packed_addon
-                )
-
-        if unpacked_addons:
-            for package_name, addon_path in unpacked_addons:
-                install_addon_from_folder(
-                    anki_base_dir=anki_base_dir,
-                    package_name=package_name,
-                    addon_path=addon_path,
-                )
-
-        if addon_configs:
-            for package_name, config_values in addon_configs:
-                create_addon_config(
-                    anki_base_dir=anki_base_dir,
-                    package_name=package_name,
-                    user_config=config_values,
-                )
+        with timer.phase("addon_install"):
+            if packed_addons:
+                for packed_addon in packed_addons:
+                    install_addon_from_package(
+                        addon_manager=main_window.addonManager,
+                        addon_path=packed_addon,
+                        cache_dir=cache_dir,
+                    )
+
+            if unpacked_addons:
+                for package_name, addon_path in unpacked_addons:
+                    install_addon_from_folder(
+                        anki_base_dir=anki_base_dir,
+                        package_name=package_name,
+                        addon_path=addon_path,
+                        install_mode=unpacked_addons_install_mode,
+                        cache_dir=cache_dir,
+                    )
+
+            if addon_configs:
+                for package_name, config_values in addon_configs:
+                    create_addon_config(
+                        anki_base_dir=anki_base_dir,
+                        package_name=package_name,
+                        user_config=config_values,
+                    )
 
         if preset_anki_state and preset_anki_state.meta_storage:
             update_anki_meta_state(
@@ -99,12 +115,20 @@ def post_ui_setup_callback_factory(
             )
 
         if not skip_loading_addons:
-            main_window.addonManager.loadAddons()
+            with timer.phase("addon_load"), addon_imports_profiled(
+                package_names=main_window.addonManager.allAddons(), reports=reports
+            ):
+                main_window.addonManager.loadAddons()
 
     return post_ui_setup_callback
 
 
-def custom_init_factory(post_ui_setup_callback: PostUISetupCallbackType):
+def custom_init_factory(
+    post_ui_setup_callback: PostUISetupCallbackType,
+    phase_timer: Optional[PhaseTimer] = None,
+):
+    timer = phase_timer or PhaseTimer()
+
     def custom_init(
         main_window: AnkiQt,
         app: aqt.AnkiApp,
@@ -140,7 +164,8 @@ def custom_init_factory(post_ui_setup_callback: PostUISetupCallbackType):
         main_window.app = app
         main_window.pm = profileManager
         main_window.safeMode = False  # disable safe mode, of no use to us
-        main_window.setupUI()
+        with timer.phase("setup_ui"):
+            main_window.setupUI()
 
         post_ui_setup_callback(main_window)
 
@@ -155,24 +180,29 @@ def custom_init_factory(post_ui_setup_callback: PostUISetupCallbackType):
 @contextmanager
 def patch_anki(
     post_ui_setup_callback: PostUISetupCallbackType,
+    phase_timer: Optional[PhaseTimer] = None,
+    web_view_registry: Optional[WebViewRegistry] = None,
 ) -> Iterator[str]:
     """Patch Anki to:
     - allow more fine-grained control of test execution environment
     - enable concurrent testing
     - bypass blocking update dialog
+    - keep track of created web views (if a registry is provided)
     """
     from anki.utils import checksum
     from aqt import AnkiApp, errors
     from aqt.main import AnkiQt
+    from aqt.webview import AnkiWebView
 
     old_init = AnkiQt.__init__
     old_key = AnkiApp.KEY
     old_setupAutoUpdate = AnkiQt.setupAutoUpdate
     old_maybe_check_for_addon_updates = AnkiQt.maybe_check_for_addon_updates
     old_errorHandler = errors.ErrorHandler
+    old_web_view_init = AnkiWebView.__init__
 
     patched_ankiqt_init = custom_init_factory(
-        post_ui_setup_callback=post_ui_setup_callback
+        post_ui_setup_callback=post_ui_setup_callback, phase_timer=phase_timer
     )
 
     AnkiQt.__init__ = patched_ankiqt_init  # type: ignore
@@ -181,6 +211,14 @@ def patch_anki(
     AnkiQt.maybe_check_for_addon_updates = Mock()  # type: ignore[assignment]
     errors.ErrorHandler = Mock()  # type: ignore[misc]
 
+    if web_view_registry is not None:
+
+        def registering_web_view_init(web_view: AnkiWebView, *args, **kwargs):
+            old_web_view_init(web_view, *args, **kwargs)
+            web_view_registry.register(web_view)
+
+        AnkiWebView.__init__ = registering_web_view_init  # type: ignore
+
     yield AnkiApp.KEY
 
     AnkiQt.__init__ = old_init  # type: ignore[assignment]
@@ -190,6 +228,7 @@ def patch_anki(
         old_maybe_check_for_addon_updates
     )
     errors.ErrorHandler = old_errorHandler  # type: ignore[misc]
+    AnkiWebView.__init__ = old_web_view_init  # type: ignore[assignment]
 
 
 def set_qt_message_handler_installer(message_handler_installer: Callable):
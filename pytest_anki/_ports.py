@@ -0,0 +1,138 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import os
+import re
+import socket
+import sys
+import tempfile
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+from ._types import PathLike
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+# Ports are handed out from below the ephemeral port range of most systems, so
+# that they do not collide with ports assigned by the OS
+_PORT_RANGE_START = 20000
+_PORT_RANGE_END = 32000
+_PORTS_PER_WORKER = 100
+
+
+def get_worker_port_range(worker_id: Optional[str] = None) -> range:
+    """Get the range of ports assigned to a pytest-xdist worker
+
+    Each worker (identified by PYTEST_XDIST_WORKER by default) gets its own
+    range, so that parallel workers do not compete for the same ports. Test
+    runs that are not distributed use the first range.
+    """
+    if worker_id is None:
+        worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+
+    if worker_id and (match := re.fullmatch(r"gw(\d+)", worker_id)):
+        slot = int(match.group(1)) + 1
+    else:
+        slot = 0
+
+    slots = (_PORT_RANGE_END - _PORT_RANGE_START) // _PORTS_PER_WORKER
+    start = _PORT_RANGE_START + (slot % slots) * _PORTS_PER_WORKER
+
+    return range(start, start + _PORTS_PER_WORKER)
+
+
+@contextmanager
+def reserved_port(
+    lock_dir: Optional[PathLike] = None, worker_id: Optional[str] = None
+) -> Iterator[int]:
+    """Context manager that reserves a free port from the worker's port range
+
+    Reservations are held as locks on per-port lock files, which are shared by
+    all test processes of the current user, so that a port is never handed out
+    twice while in use. Locks are released when the context is left, or when
+    the reserving process exits. Lock files that cannot be opened count as
+    taken.
+    """
+    lock_path = Path(lock_dir or _get_default_lock_dir())
+    lock_path.mkdir(parents=True, exist_ok=True)
+
+    for port in get_worker_port_range(worker_id):
+        if (lock_file := _lock(lock_path / f"{port}.lock")) is None:
+            continue
+
+        try:
+            if not _is_port_available(port):
+                continue
+            yield port
+            return
+        finally:
+            lock_file.close()
+
+    raise OSError("Could not find a free port for remote debugging")
+
+
+def _get_default_lock_dir() -> Path:
+    lock_dir_name = "pytest_anki_ports"
+    # The temporary folder is shared by all users on POSIX systems, where lock
+    # files created by other users might not be accessible
+    if hasattr(os, "getuid"):
+        lock_dir_name += f"_{os.getuid()}"
+    return Path(tempfile.gettempdir()) / lock_dir_name
+
+
+def _lock(path: Path) -> Optional[IO]:
+    lock_file: Optional[IO] = None
+    try:
+        lock_file = path.open("a")
+        if sys.platform == "win32":
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:  # locked by another process, or not accessible
+        if lock_file is not None:
+            lock_file.close()
+        return None
+    return lock_file
+
+
+def _is_port_available(port: int) -> bool:
+    # Chromium sets SO_REUSEADDR on its server sockets, so ports that are still
+    # in TIME_WAIT are fine to use
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
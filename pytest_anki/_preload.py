@@ -0,0 +1,68 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import importlib
+from typing import Iterable, Tuple
+
+from ._errors import AnkiSessionError
+
+# Modules that are expensive to import and safe to import ahead of forking, i.e.
+# that neither spawn threads nor create a QApplication at import time
+WARM_FORK_MODULES: Tuple[str, ...] = (
+    "PyQt5.QtWebEngineWidgets",
+    "anki.collection",
+    "anki.importing.apkg",
+    "aqt",
+    "aqt.addons",
+    "aqt.main",
+    "aqt.profiles",
+    "aqt.webview",
+    "selenium.webdriver",
+)
+
+
+def preload_modules(module_names: Iterable[str]):
+    """Import the specified modules into the current process, so that any test
+    subprocesses forked from it start out with these modules already loaded.
+
+    Add-on packages themselves should not be preloaded, as Anki's add-on manager
+    would then skip executing their initialization code in each session.
+    """
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+    from PyQt5.QtWidgets import QApplication
+
+    if QApplication.instance() is not None:
+        # Qt state does not survive forking, so warm processes need to stay
+        # free of any application instance
+        raise AnkiSessionError(
+            "A QApplication instance was created while preloading modules"
+        )
@@ -29,9 +29,21 @@
 # Any modifications to this file must keep this entire header intact.
 
 
+import queue
+import threading
+from concurrent.futures import Future
 from typing import Any, Callable, Dict, Optional, Tuple
 
-from PyQt5.QtCore import QMessageLogContext, QObject, QRunnable, QtMsgType, pyqtSignal
+from PyQt5.QtCore import (
+    QEventLoop,
+    QMessageLogContext,
+    QObject,
+    QRunnable,
+    QTimer,
+    QtMsgType,
+    pyqtSignal,
+)
+from pytestqt.exceptions import TimeoutError as QtBotTimeoutError
 
 
 class QtMessageMatcher(QObject):
@@ -81,3 +93,74 @@ class SignallingWorker(QRunnable):
     @property
     def error(self) -> Optional[Exception]:
         return self._error
+
+
+class CommandThread:
+
+    """
+    Persistent worker thread that runs submitted tasks one after another, in the
+    order they were submitted. Unlike SignallingWorker, this avoids handing each
+    task off to a thread pool.
+    """
+
+    def __init__(self, name: str):
+        self._tasks: "queue.Queue[Optional[Tuple[Callable[[], Any], Future]]]" = (
+            queue.Queue()
+        )
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, task: Callable[[], Any]) -> Future:
+        future: Future = Future()
+        self._tasks.put((task, future))
+        return future
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop thread once all previously submitted tasks have run"""
+        self._tasks.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while (item := self._tasks.get()) is not None:
+            task, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = task()
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class _FutureSignals(QObject):
+    done = pyqtSignal()
+
+
+def wait_for_future(future: Future, timeout: int = 5000) -> Any:
+    """Wait for future to resolve while processing Qt events, returning its result
+
+    Raises pytest-qt's TimeoutError if the future does not resolve within the
+    provided timeout (in ms).
+    """
+    if not future.done():
+        event_loop = QEventLoop()
+        signals = _FutureSignals()
+        # Signals emitted from other threads are queued, so a future resolving
+        # right before the event loop starts still ends it
+        signals.done.connect(event_loop.quit)
+        future.add_done_callback(lambda _: signals.done.emit())
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(event_loop.quit)
+        timer.start(timeout)
+
+        if not future.done():
+            event_loop.exec_()
+
+        timer.stop()
+
+        if not future.done():
+            raise QtBotTimeoutError(f"Future did not resolve within {timeout} ms")
+
+    return future.result()
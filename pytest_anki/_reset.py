@@ -0,0 +1,135 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+from PyQt5.QtWidgets import QApplication
+
+from ._anki import get_anki_state, reset_anki_state
+
+if TYPE_CHECKING:
+    from aqt.main import AnkiQt
+
+HookSnapshot = Tuple[Dict[str, List[Any]], List[Tuple[List[Any], List[Any]]]]
+
+
+def get_hook_lists() -> Dict[str, List[Any]]:
+    """Get the callback lists of all hooks defined by anki.hooks and aqt.gui_hooks,
+    keyed by qualified hook name"""
+    from anki import hooks
+    from aqt import gui_hooks
+
+    hook_lists: Dict[int, Tuple[str, List[Any]]] = {}
+
+    for module_name, module in (("hooks", hooks), ("gui_hooks", gui_hooks)):
+        for attribute_name in dir(module):
+            attribute = getattr(module, attribute_name)
+            hook_list = getattr(attribute, "_hooks", None)
+            if isinstance(hook_list, list) and id(hook_list) not in hook_lists:
+                # gui_hooks re-exports some of anki's hooks
+                hook_lists[id(hook_list)] = (
+                    f"{module_name}.{attribute_name}",
+                    hook_list,
+                )
+
+    return dict(hook_lists.values())
+
+
+def get_hook_callback_counts() -> Dict[str, int]:
+    """Get the number of callbacks registered on each of Anki's hooks, including
+    legacy hooks registered via anki.hooks.addHook"""
+    from anki import hooks
+
+    callback_counts = {
+        f"addHook.{name}": len(funcs) for name, funcs in hooks._hooks.items()
+    }
+    callback_counts.update(
+        {name: len(hook_list) for name, hook_list in get_hook_lists().items()}
+    )
+
+    return callback_counts
+
+
+def get_hook_snapshot() -> HookSnapshot:
+    """Record the callbacks currently registered on all of Anki's hooks"""
+    from anki import hooks
+
+    legacy_hooks = {name: list(funcs) for name, funcs in hooks._hooks.items()}
+    hook_lists = [
+        (hook_list, list(hook_list)) for hook_list in get_hook_lists().values()
+    ]
+
+    return legacy_hooks, hook_lists
+
+
+def restore_hook_snapshot(hook_snapshot: HookSnapshot):
+    """Remove any hook callbacks registered after the snapshot was taken, and
+    re-add any that were removed"""
+    from anki import hooks
+
+    legacy_hooks, hook_lists = hook_snapshot
+
+    hooks._hooks = {name: list(funcs) for name, funcs in legacy_hooks.items()}
+
+    for hook_list, callbacks in hook_lists:
+        hook_list[:] = callbacks
+
+
+def close_new_windows(main_window: "AnkiQt", known_window_ids: List[int]):
+    """Close Anki's dialogs and any other top-level windows that are not part of
+    the provided list of known windows"""
+    import aqt
+
+    aqt.dialogs.closeAll(onsuccess=lambda: None)
+
+    for widget in QApplication.topLevelWidgets():
+        if (
+            widget is not main_window
+            and id(widget) not in known_window_ids
+            and widget.isVisible()
+        ):
+            widget.close()
+
+
+@contextmanager
+def anki_state_reset(main_window: "AnkiQt") -> Iterator[None]:
+    """Context manager that records Anki's hooks, storage objects, and open windows
+    on entry, resetting them to the recorded state on exit"""
+    hook_snapshot = get_hook_snapshot()
+    anki_state = get_anki_state(main_window)
+    known_window_ids = [id(widget) for widget in QApplication.topLevelWidgets()]
+
+    try:
+        yield
+    finally:
+        close_new_windows(main_window=main_window, known_window_ids=known_window_ids)
+        restore_hook_snapshot(hook_snapshot)
+        reset_anki_state(main_window=main_window, anki_state=anki_state)
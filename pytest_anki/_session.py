@@ -28,8 +28,13 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+import json
 import re
+import time
+import uuid
+from concurrent.futures import Future
 from contextlib import contextmanager
+from functools import partial
 from types import ModuleType
 from typing import (
     TYPE_CHECKING,
@@ -39,25 +44,46 @@ from typing import (
     Iterator,
     List,
     Optional,
+    Sequence,
     Tuple,
     Union,
 )
 
-from anki.importing.apkg import AnkiPackageImporter
 from PyQt5.QtCore import QThreadPool, QTimer
 from PyQt5.QtWebEngineWidgets import QWebEngineProfile
 from selenium import webdriver
+from selenium.common.exceptions import NoSuchWindowException
 
-from ._addons import ConfigPaths, create_addon_config
+from ._addons import (
+    AddonLoadReport,
+    ConfigPaths,
+    addon_imports_profiled,
+    create_addon_config,
+)
 from ._anki import AnkiStateUpdate, AnkiWebViewType, get_collection, update_anki_state
+from ._collection import collection_rolled_back
+from ._decks import get_deck_ids, import_deck_packages
 from ._errors import AnkiSessionError
-from ._qt import SignallingWorker
+from ._notes import InstalledNotes, NotesSpec, install_notes, remove_installed_notes
+from ._qt import CommandThread, SignallingWorker, wait_for_future
+from ._reset import anki_state_reset
+from ._synthetic import SyntheticCollection, generate_collection
+from ._timing import PhaseSummary, PhaseTimer, summarize_timings
 from ._types import PathLike
+from ._webdriver import ChromeDriverPool
+from ._webviews import (
+    DevToolsTarget,
+    WebViewMetrics,
+    WebViewRegistry,
+    get_web_view_metrics,
+    get_web_view_title,
+)
 
 if TYPE_CHECKING:
     from anki.collection import Collection
     from aqt import AnkiApp
     from aqt.main import AnkiQt
+    from aqt.webview import AnkiWebView
     from pytestqt.qtbot import QtBot
 
 
@@ -70,6 +96,12 @@ class AnkiSession:
         base: str,
         qtbot: "QtBot",
         web_debugging_port: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        cloned_from_template: bool = False,
+        phase_timer: Optional[PhaseTimer] = None,
+        addon_load_reports: Optional[List[AddonLoadReport]] = None,
+        chrome_driver_pool: Optional[ChromeDriverPool] = None,
+        web_view_registry: Optional[WebViewRegistry] = None,
     ):
         """Anki test session object, returned by anki_session fixture.
 
@@ -81,6 +113,22 @@ class AnkiSession:
             mw {AnkiQt} -- Anki QMainWindow instance
             user {str} -- User profile name (e.g. "User 1")
             base {str} -- Path to Anki base directory
+            cache_dir {Optional[str]} -- Path to folder for caching extracted
+                deck packages and imported collection snapshots (default: {None},
+                i.e. no caching)
+            cloned_from_template {bool} -- Whether the base directory was cloned
+                from a profile template, so that the profile's collection starts
+                out in the same state in every session (default: {False})
+            phase_timer {Optional[PhaseTimer]} -- Timer recording the launch phases
+                of the session
+            addon_load_reports {Optional[List[AddonLoadReport]]} -- Load reports of
+                the add-ons loaded at launch time
+            chrome_driver_pool {Optional[ChromeDriverPool]} -- Shared chromedriver
+                service to attach web drivers to (default: {None}, i.e. start a
+                chromedriver service for this session only)
+            web_view_registry {Optional[WebViewRegistry]} -- Registry of the web
+                views created during the session (default: {None}, i.e. only keep
+                track of web views that exist at initialization time)
         """
 
         self._app = app
@@ -89,7 +137,27 @@ class AnkiSession:
         self._base = base
         self._qtbot = qtbot
         self._web_debugging_port = web_debugging_port
+        self._cache_dir = cache_dir
+        self._cloned_from_template = cloned_from_template
+        self._phase_timer = phase_timer or PhaseTimer()
+        self._addon_load_reports = (
+            addon_load_reports if addon_load_reports is not None else []
+        )
         self._chrome_driver: Optional[webdriver.Chrome] = None
+        self._chrome_driver_thread: Optional[CommandThread] = None
+        self._chrome_driver_latencies: List[Dict[str, float]] = []
+        self._owns_chrome_driver_pool = chrome_driver_pool is None
+        self._chrome_driver_pool = chrome_driver_pool or ChromeDriverPool()
+
+        if web_view_registry is None:
+            from aqt.webview import AnkiWebView
+
+            web_view_registry = WebViewRegistry()
+            for widget in app.allWidgets():
+                if isinstance(widget, AnkiWebView):
+                    web_view_registry.register(widget)
+
+        self._web_view_registry = web_view_registry
 
     # Key session properties ####
 
@@ -113,6 +181,18 @@ class AnkiSession:
         """Path to Anki base directory"""
         return self._base
 
+    @property
+    def timings(self) -> Dict[str, float]:
+        """Wall time in seconds spent in each phase of launching (and, once the
+        session has been torn down, closing) Anki.
+
+        Phases include: base_directory, patch_anki, profile_creation, aqt_run,
+        setup_ui, addon_install, addon_load, web_debugging_wait, profile_load,
+        chrome_driver_attach, profile_unload, and cleanup. Note that setup_ui,
+        addon_install, and addon_load run as part of aqt_run.
+        """
+        return self._phase_timer.timings
+
     # Interaction with Qt
 
     @property
@@ -170,31 +250,68 @@ class AnkiSession:
 
         self.unload_profile()
 
-    # Deck management ####
+    @contextmanager
+    def collection_checkpoint(self) -> Iterator["Collection"]:
+        """Context manager that snapshots the current collection and its media
+        folder, rolling both back to the snapshot upon context exit.
 
-    def install_deck(self, path: PathLike) -> int:
-        """Install deck from specified .apkg file, returning deck ID"""
-        old_ids = set(self._get_deck_ids())
+        Allows resetting collection state between test cases without having to
+        relaunch Anki. Requires a loaded profile.
+        """
+        collection = self.collection
 
-        importer = AnkiPackageImporter(col=self.collection, file=str(path))
-        importer.run()
+        with collection_rolled_back(collection):
+            yield collection
 
-        new_ids = set(self._get_deck_ids())
+        self._mw.reset()
 
-        # deck IDs are strings on <=2.1.26
-        deck_id = int(next(iter(new_ids - old_ids)))
+    # Deck management ####
 
-        return deck_id
+    def install_deck(self, path: PathLike) -> int:
+        """Install deck from specified .apkg file, returning deck ID"""
+        deck_ids = self.install_decks(paths=[path])[path]
+        if not deck_ids:
+            raise AnkiSessionError(
+                f"Importing {path} did not create any new decks. Its cards were"
+                " placed in decks that already exist in the collection."
+            )
+        return deck_ids[0]
+
+    def install_decks(self, paths: Sequence[PathLike]) -> Dict[PathLike, List[int]]:
+        """Install decks from specified .apkg files in bulk, returning a mapping
+        of each path to the IDs of all decks created by importing it (top-level
+        decks first, followed by their subdecks)
+
+        All packages are imported within a single collection transaction, which
+        makes this considerably faster than calling install_deck repeatedly.
+        Imports into the still pristine collection of a profile cloned from a
+        template are snapshotted, so that other sessions importing the same
+        packages restore the snapshot instead of running the importer.
+        """
+        return import_deck_packages(
+            collection=self.collection,
+            paths=paths,
+            existing_deck_ids=get_deck_ids(self.collection),
+            cache_dir=self._cache_dir,
+            snapshot_pristine=(
+                self._cloned_from_template and self._mw.pm.name == self._user
+            ),
+        )
 
     def remove_deck(self, deck_id: int):
         """Remove deck as specified by provided deck ID"""
+        self.remove_decks(deck_ids=[deck_id])
+
+    def remove_decks(self, deck_ids: Sequence[int]):
+        """Remove decks as specified by provided deck IDs"""
         try:  # 2.1.28+
             # Deck methods on 2.1.45 and up use a DeckId NewType derived from int.
             # This only makes a difference at type-check time, so we stick with
-            # passing in an int for now.
-            self.collection.decks.remove([deck_id])  # type: ignore[list-item]
+            # passing in ints for now.
+            self.collection.decks.remove(list(deck_ids))  # type: ignore[arg-type]
         except AttributeError:  # legacy
-            self.collection.decks.rem(deck_id, cardsToo=True)
+            for deck_id in deck_ids:
+                self.collection.decks.rem(deck_id, cardsToo=True)
 
     @contextmanager
     def deck_installed(self, path: PathLike) -> Iterator[int]:
@@ -206,19 +323,129 @@ class AnkiSession:
 
         self.remove_deck(deck_id=deck_id)
 
-    def _get_deck_ids(self) -> List[int]:
-        try:  # 2.1.28+
-            return [d.id for d in self.collection.decks.all_names_and_ids()]
-        except AttributeError:  # legacy
-            return self.collection.decks.allIds()  # type: ignore[attr-defined]
+    @contextmanager
+    def decks_installed(
+        self, paths: Sequence[PathLike]
+    ) -> Iterator[Dict[PathLike, List[int]]]:
+        """Context manager that takes care of installing decks in bulk and then
+        removing all of them upon context completion"""
+        deck_ids = self.install_decks(paths=paths)
+
+        yield deck_ids
+
+        self.remove_decks(
+            deck_ids=[deck_id for ids in deck_ids.values() for deck_id in ids]
+        )
+
+    # Note management ####
+
+    def install_notes(self, spec: NotesSpec) -> InstalledNotes:
+        """Create notes, note types, and decks as described by the provided spec,
+        returning the IDs of all created objects.
+
+        Much faster than installing an .apkg file for small, tailored sets of
+        notes, as no package needs to be built, extracted, and imported.
+        """
+        return install_notes(collection=self.collection, spec=spec)
+
+    def remove_notes(self, installed: InstalledNotes):
+        """Remove notes created by install_notes, along with any decks and note
+        types created alongside them"""
+        remove_installed_notes(collection=self.collection, installed=installed)
+
+    @contextmanager
+    def notes_installed(self, spec: NotesSpec) -> Iterator[InstalledNotes]:
+        """Context manager that takes care of creating the notes described by
+        spec and then removing them upon context completion"""
+        installed = self.install_notes(spec=spec)
+
+        yield installed
+
+        self.remove_notes(installed=installed)
+
+    # Synthetic content ####
+
+    def generate_collection(
+        self,
+        notes: int = 1000,
+        cards_per_note: int = 1,
+        decks: int = 1,
+        tags: int = 0,
+        review_history_days: int = 0,
+        seed: int = 0,
+    ) -> SyntheticCollection:
+        """Populate collection with synthetic notes, cards, and review history,
+        e.g. for testing how add-ons scale to large collections. Requires a loaded
+        profile.
+
+        Keyword Arguments:
+            notes {int} -- Number of notes to add (default: {1000})
+            cards_per_note {int} -- Number of cards generated for each note, using
+                a dedicated note type (default: {1})
+            decks {int} -- Number of decks to spread notes across (default: {1})
+            tags {int} -- Number of distinct tags, one of which is assigned to each
+                note (default: {0})
+            review_history_days {int} -- If non-zero, every card is given a review
+                history reaching back up to the specified number of days and
+                scheduled accordingly. Otherwise all cards are new (default: {0})
+            seed {int} -- Seed determining note contents and scheduling
+                (default: {0})
+
+        Returns:
+            SyntheticCollection -- IDs and counts of the generated content
+        """
+        return generate_collection(
+            collection=self.collection,
+            notes=notes,
+            cards_per_note=cards_per_note,
+            decks=decks,
+            tags=tags,
+            review_history_days=review_history_days,
+            seed=seed,
+        )
 
     # Add-on loading ####
 
     def load_addon(self, package_name: str) -> ModuleType:
         """Dynamically import an add-on as specified by its package name"""
-        addon_package = __import__(package_name)
+        with addon_imports_profiled(
+            package_names=[package_name], reports=self._addon_load_reports
+        ):
+            addon_package = __import__(package_name)
         return addon_package
 
+    @property
+    def addon_load_report(self) -> List[AddonLoadReport]:
+        """Import time, number of imported modules, and registered hooks of each
+        add-on loaded at launch time or via load_addon(), in load order"""
+        return list(self._addon_load_reports)
+
+    def assert_addon_load_time_within(
+        self, budget: float, package_name: Optional[str] = None
+    ):
+        """Assert that loading each add-on (or only the add-on specified by its
+        package name) took no longer than the provided budget in seconds"""
+        reports = [
+            report
+            for report in self._addon_load_reports
+            if package_name is None or report.package_name == package_name
+        ]
+
+        if package_name is not None and not reports:
+            raise AnkiSessionError(f"Add-on '{package_name}' has not been loaded")
+
+        over_budget = [
+            f"{report.package_name} ({report.import_time:.3f}s)"
+            for report in reports
+            if report.import_time > budget
+        ]
+
+        assert (
+            not over_budget
+        ), f"Add-on load time exceeded budget of {budget:.3f}s: " + ", ".join(
+            over_budget
+        )
+
     # Add-on config handling ####
 
     def create_addon_config(
@@ -282,6 +509,17 @@ class AnkiSession:
         """
         update_anki_state(main_window=self._mw, anki_state_update=anki_state_update)
 
+    @contextmanager
+    def anki_state_reset(self) -> Iterator[None]:
+        """Context manager that records the callbacks registered on Anki's hooks,
+        the state of Anki's storage objects (see update_anki_state), and the open
+        windows on entry, resetting all of them on exit.
+
+        Used to isolate tests that share a single Anki session.
+        """
+        with anki_state_reset(main_window=self._mw):
+            yield
+
     # Synchronicity / event loop handling ####
 
     def run_in_thread_and_wait(
@@ -304,9 +542,133 @@ class AnkiSession:
 
         return worker.result
 
+    def wait_for_future(self, future: Future, timeout: int = 5000) -> Any:
+        """Wait for future to resolve while processing Qt events, e.g. for the
+        result of a test function queued with submit_to_chrome_driver
+
+        Args:
+            future: Future to wait for
+            timeout: Time to wait for the future until qtbot raises a TimeoutError
+        """
+        return wait_for_future(future, timeout=timeout)
+
     def set_timeout(self, task: Callable, delay: int, *args, **kwargs):
         QTimer.singleShot(delay, lambda: task(*args, **kwargs))
 
+    # Web view interaction ####
+
+    def get_web_view(
+        self, target_web_view: Union[AnkiWebViewType, str]
+    ) -> "AnkiWebView":
+        """Get open web view as identified by its type or title. Visible web views
+        take precedence over hidden ones."""
+        if not (web_views := self._web_view_registry.get_web_views(target_web_view)):
+            raise AnkiSessionError(
+                "Could not find web view with provided title"
+                f" '{get_web_view_title(target_web_view)}'"
+            )
+
+        return web_views[0]
+
+    def eval_js(
+        self,
+        target_web_view: Union[AnkiWebViewType, str],
+        code: str,
+        timeout: int = 5000,
+    ) -> Any:
+        """Evaluate JavaScript code in web view and return the result, without
+        requiring the web debugging interface.
+
+        Args:
+            target_web_view: Web view as identified by its type or title
+            code: JavaScript code. The value of the last statement is returned,
+                as converted by Qt (e.g. arrays to lists, objects to dicts)
+            timeout: Time to wait for the result until qtbot raises a TimeoutError
+        """
+        web_view = self.get_web_view(target_web_view)
+
+        with self._qtbot.wait_callback(timeout=timeout) as callback:
+            web_view.evalWithCallback(code, callback)
+
+        return callback.args[0]
+
+    def eval_js_batch(
+        self,
+        target_web_view: Union[AnkiWebViewType, str],
+        codes: Sequence[str],
+        timeout: int = 5000,
+    ) -> List[Any]:
+        """Evaluate multiple snippets of JavaScript code in web view, returning
+        their results in order. All snippets are queued at once, so that only a
+        single wait on the event loop is required.
+
+        Args:
+            target_web_view: Web view as identified by its type or title
+            codes: JavaScript code snippets, as described in eval_js
+            timeout: Time to wait for all results until qtbot raises a TimeoutError
+        """
+        web_view = self.get_web_view(target_web_view)
+        results: Dict[int, Any] = {}
+
+        for index, code in enumerate(codes):
+            web_view.evalWithCallback(code, partial(results.__setitem__, index))
+
+        self._qtbot.wait_until(lambda: len(results) == len(codes), timeout=timeout)
+
+        return [results[index] for index in range(len(codes))]
+
+    def eval_js_async(
+        self,
+        target_web_view: Union[AnkiWebViewType, str],
+        code: str,
+        timeout: int = 5000,
+    ) -> Any:
+        """Evaluate JavaScript code in web view, wait for its result to settle if
+        it is a Promise, and return it.
+
+        Results are passed back through Anki's pycmd bridge, so they need to be
+        JSON-serializable. Rejected promises raise an AnkiSessionError.
+
+        Args:
+            target_web_view: Web view as identified by its type or title
+            code: JavaScript code, as described in eval_js
+            timeout: Time to wait for the result until qtbot raises a TimeoutError
+        """
+        from aqt import gui_hooks
+
+        web_view = self.get_web_view(target_web_view)
+        message_prefix = f"pytest_anki:eval_js_async:{uuid.uuid4().hex}:"
+        outcomes: List[Dict[str, Any]] = []
+
+        def on_js_message(
+            handled: Tuple[bool, Any], message: str, context: Any
+        ) -> Tuple[bool, Any]:
+            if not message.startswith(message_prefix):
+                return handled
+            outcomes.append(json.loads(message[len(message_prefix) :]))
+            return (True, None)
+
+        # Indirect eval evaluates the code in global scope, just like eval_js.
+        # Running it within the executor turns synchronous throws into
+        # rejections.
+        wrapped_code = f"""
+new Promise((resolve) => resolve((0, eval)({json.dumps(code)}))).then(
+    (result) => pycmd({json.dumps(message_prefix)} + JSON.stringify({{ result }})),
+    (error) => pycmd({json.dumps(message_prefix)} + JSON.stringify({{ error: String(error) }}))
+);"""
+
+        gui_hooks.webview_did_receive_js_message.append(on_js_message)
+        try:
+            web_view.eval(wrapped_code)
+            self._qtbot.wait_until(lambda: bool(outcomes), timeout=timeout)
+        finally:
+            gui_hooks.webview_did_receive_js_message.remove(on_js_message)
+
+        if "error" in (outcome := outcomes[0]):
+            raise AnkiSessionError(f"JavaScript evaluation failed: {outcome['error']}")
+
+        return outcome.get("result")
+
     # Web debugging ####
 
     @contextmanager
@@ -326,61 +688,224 @@ class AnkiSession:
         self.mw.app.setApplicationName(old_application_name)
         self.mw.app.setApplicationVersion(old_application_version)
 
+    def get_devtools_target(
+        self, target_web_view: Union[AnkiWebViewType, str]
+    ) -> DevToolsTarget:
+        """Get the devtools target of a web view as identified by its type or title,
+        e.g. to connect to the web view via the Chrome DevTools Protocol"""
+        return self.run_in_thread_and_wait(
+            self._web_view_registry.get_devtools_target,
+            task_args=(self._get_web_debugging_port(), target_web_view),
+        )
+
+    def measure_web_view(
+        self, target_web_view: Union[AnkiWebViewType, str], timeout: int = 5000
+    ) -> WebViewMetrics:
+        """Collect render and load performance metrics of a web view over the
+        Chrome DevTools Protocol, e.g. to track card render times across Anki
+        and Chromium versions. Requires the web debugging interface.
+
+        Long tasks are only recorded for pages that were loaded by a session
+        launched with web debugging enabled.
+
+        Args:
+            target_web_view: Web view as identified by its type or title
+            timeout: Time to wait for the metrics until qtbot raises a TimeoutError
+        """
+        web_debugging_port = self._get_web_debugging_port()
+        chromium_version = self.chromium_version
+
+        def collect_metrics() -> WebViewMetrics:
+            target = self._web_view_registry.get_devtools_target(
+                web_debugging_port, target_web_view
+            )
+            return get_web_view_metrics(
+                target=target,
+                chromium_version=chromium_version,
+                timeout=timeout / 1000,
+            )
+
+        return self.run_in_thread_and_wait(collect_metrics, timeout=timeout)
+
     def _switch_chrome_driver_to_web_view(
-        self, driver: webdriver.Chrome, web_view_title: str
+        self, driver: webdriver.Chrome, web_debugging_port: int, web_view_title: str
     ):
-        for window_handle in driver.window_handles:
-            driver.switch_to.window(window_handle)
-            if driver.title == web_view_title:
-                break
-        else:
-            raise AnkiSessionError(
-                f"Could not find web view with provided title '{web_view_title}'"
-            )
+        target = self._web_view_registry.get_devtools_target(
+            web_debugging_port, web_view_title
+        )
+
+        # Depending on its version, chromedriver identifies windows by their
+        # devtools target ID with or without a prefix
+        for window_handle in (target.id, f"CDwindow-{target.id}"):
+            try:
+                driver.switch_to.window(window_handle)
+                return
+            except NoSuchWindowException:
+                continue
+
+        raise AnkiSessionError(
+            f"Could not switch to web view with provided title '{web_view_title}'"
+        )
 
     def run_with_chrome_driver(
         self,
-        test_function: Callable[[webdriver.Chrome], Optional[bool]],
+        test_function: Callable[[webdriver.Chrome], Any],
         target_web_view: Optional[Union[AnkiWebViewType, str]] = None,
         timeout: int = 5000,
-    ):
-        """[summary]
+    ) -> Any:
+        """Run test function with a web driver connected to Anki's web views and
+        return its result, processing Qt events in the meantime.
 
         Args:
-            test_function (Callable[[webdriver.Chrome], Optional[bool]]): [description]
-            target_web_view: Web view as identified by its title. Defaults to None.
+            test_function: Function that is passed the web driver. Runs on the
+                session's web driver thread.
+            target_web_view: Web view as identified by its type or title. Defaults
+                to None, i.e. the web view the driver is currently connected to.
             timeout: Time to wait for task to complete until qtbot raises a TimeoutError
         """
-        if self._web_debugging_port is None:
-            raise AnkiSessionError("Web debugging interface is not active")
+        return self.run_batch_with_chrome_driver(
+            [test_function], target_web_view=target_web_view, timeout=timeout
+        )[0]
 
-        web_view_title: Optional[str]
+    def run_batch_with_chrome_driver(
+        self,
+        test_functions: Sequence[Callable[[webdriver.Chrome], Any]],
+        target_web_view: Optional[Union[AnkiWebViewType, str]] = None,
+        timeout: int = 5000,
+    ) -> List[Any]:
+        """Run several test functions with the web driver in a single round trip
+        to the web driver thread, returning their results in order.
 
-        if isinstance(target_web_view, AnkiWebViewType):
-            web_view_title = target_web_view.value
-        else:
-            web_view_title = target_web_view
+        Args:
+            test_functions: Functions that are passed the web driver
+            target_web_view: Web view as identified by its type or title
+            timeout: Time to wait for all test functions to complete until qtbot
+                raises a TimeoutError
+        """
+        self._get_chrome_driver(timeout=timeout)
 
-        def test_wrapper() -> Optional[bool]:
-            if not self._chrome_driver:
-                options = webdriver.ChromeOptions()
-                options.add_experimental_option(
-                    "debuggerAddress", f"127.0.0.1:{self._web_debugging_port}"
-                )
-                self._chrome_driver = webdriver.Chrome(options=options)
+        submitted_at = time.perf_counter()
+        future, latencies = self._submit_chrome_driver_task(
+            lambda driver: [test_function(driver) for test_function in test_functions],
+            target_web_view=target_web_view,
+        )
+
+        with self._allow_selenium_to_detect_anki():
+            results = wait_for_future(future, timeout=timeout)
+
+        latencies["round_trip"] = time.perf_counter() - submitted_at
+
+        return results
+
+    def submit_to_chrome_driver(
+        self,
+        test_function: Callable[[webdriver.Chrome], Any],
+        target_web_view: Optional[Union[AnkiWebViewType, str]] = None,
+    ) -> Future:
+        """Queue test function to run with the web driver without waiting for it,
+        returning a Future of its result.
+
+        Queued test functions run one after another in submission order. Use
+        wait_for_future to wait for the result while processing Qt events.
+        """
+        self._get_chrome_driver()
+        future, _ = self._submit_chrome_driver_task(
+            test_function, target_web_view=target_web_view
+        )
+        return future
 
-            if web_view_title:
-                self._switch_chrome_driver_to_web_view(
-                    driver=self._chrome_driver, web_view_title=web_view_title
+    @property
+    def chrome_driver_latencies(self) -> List[PhaseSummary]:
+        """Latency statistics of the web driver tasks run so far, in seconds.
+
+        Covers the time tasks spent waiting in the web driver thread's queue
+        (queue_wait), running (execution), and, for blocking calls, until the
+        results were returned to the test (round_trip).
+        """
+        return summarize_timings(self._chrome_driver_latencies)
+
+    def _get_web_debugging_port(self) -> int:
+        if self._web_debugging_port is None:
+            raise AnkiSessionError(
+                "Web debugging interface is not active. Please mark your test with"
+                " @pytest.mark.anki_web_debugging or launch the session with"
+                " enable_web_debugging=True"
+            )
+        return self._web_debugging_port
+
+    def _get_chrome_driver_thread(self) -> CommandThread:
+        if self._chrome_driver_thread is None:
+            self._chrome_driver_thread = CommandThread(name="pytest-anki-webdriver")
+        return self._chrome_driver_thread
+
+    def _get_chrome_driver(self, timeout: int = 5000) -> webdriver.Chrome:
+        if self._chrome_driver is not None:
+            return self._chrome_driver
+
+        debugger_address = f"127.0.0.1:{self._get_web_debugging_port()}"
+
+        # Attaching involves the web debugging interface, which needs the Qt event
+        # loop to keep running. Selenium only identifies the browser at this stage.
+        with self._phase_timer.phase("chrome_driver_attach"):
+            with self._allow_selenium_to_detect_anki():
+                self._chrome_driver = wait_for_future(
+                    self._get_chrome_driver_thread().submit(
+                        partial(
+                            self._chrome_driver_pool.attach,
+                            debugger_address=debugger_address,
+                        )
+                    ),
+                    timeout=timeout,
                 )
 
-            return test_function(self._chrome_driver)
+        return self._chrome_driver
 
-        with self._allow_selenium_to_detect_anki():
-            return self.run_in_thread_and_wait(test_wrapper, timeout=timeout)
+    def _submit_chrome_driver_task(
+        self,
+        task: Callable[[webdriver.Chrome], Any],
+        target_web_view: Optional[Union[AnkiWebViewType, str]],
+    ) -> Tuple[Future, Dict[str, float]]:
+        driver = self._get_chrome_driver()
+        web_debugging_port = self._get_web_debugging_port()
+        web_view_title = (
+            get_web_view_title(target_web_view) if target_web_view else None
+        )
+
+        latencies: Dict[str, float] = {}
+        self._chrome_driver_latencies.append(latencies)
+        submitted_at = time.perf_counter()
+
+        def timed_task() -> Any:
+            started_at = time.perf_counter()
+            latencies["queue_wait"] = started_at - submitted_at
+            try:
+                if web_view_title:
+                    self._switch_chrome_driver_to_web_view(
+                        driver=driver,
+                        web_debugging_port=web_debugging_port,
+                        web_view_title=web_view_title,
+                    )
+                return task(driver)
+            finally:
+                latencies["execution"] = time.perf_counter() - started_at
+
+        return self._get_chrome_driver_thread().submit(timed_task), latencies
 
     def reset_chrome_driver(self):
-        if not self._chrome_driver:
-            return
-        self._chrome_driver.quit()
+        """End the current web driver session, if any, and stop the web driver
+        thread. Subsequent calls to run_with_chrome_driver attach a new web
+        driver."""
+        if self._chrome_driver_thread is not None:
+            if self._chrome_driver:
+                # Ending the session involves the web debugging interface, which
+                # needs the Qt event loop to keep running
+                wait_for_future(
+                    self._chrome_driver_thread.submit(self._chrome_driver.quit)
+                )
+            self._chrome_driver_thread.stop()
+            self._chrome_driver_thread = None
+
         self._chrome_driver = None
+
+        if self._owns_chrome_driver_pool:
+            self._chrome_driver_pool.stop()
@@ -0,0 +1,283 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+"""
+Generation of large synthetic collections for scale testing
+"""
+
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Sequence, Tuple
+
+from ._errors import AnkiSessionError
+from ._notes import NoteTypeSpec, TemplateSpec, add_note_type, get_note_type
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+    from anki.dbproxy import DBProxy
+
+_NOTE_TYPE_NAME = "Synthetic ({} cards)"
+_DECK_NAME = "Synthetic::Deck {}"
+_TAG_NAME = "synthetic::tag{}"
+
+# Rows are passed to the backend in chunks in order to keep memory use at bay
+# for collections with millions of review log entries
+_BATCH_SIZE = 50000
+
+_SECONDS_PER_DAY = 86400
+_DEFAULT_FACTOR = 2500
+
+
+@dataclass
+class SyntheticCollection:
+    """Summary of the contents added by AnkiSession.generate_collection"""
+
+    note_type_id: int
+    deck_ids: List[int]
+    note_ids: List[int]
+    card_count: int
+    review_count: int
+
+
+def _chunked(rows: Sequence[Any]) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(rows), _BATCH_SIZE):
+        yield rows[start : start + _BATCH_SIZE]
+
+
+def _insert_rows(db: "DBProxy", table: str, rows: Sequence[Tuple]):
+    if not rows:
+        return
+    placeholders = ",".join("?" * len(rows[0]))
+    for chunk in _chunked(rows):
+        db.executemany(f"insert into {table} values ({placeholders})", list(chunk))
+
+
+def _get_next_id(db: "DBProxy", table: str) -> int:
+    """Get first ID of a new block of sequential IDs, which, like the IDs that
+    Anki assigns itself, is based on the current time in milliseconds"""
+    max_id = db.scalar(f"select max(id) from {table}") or 0
+    return max(int(time.time() * 1000), max_id + 1)
+
+
+def _get_note_type(collection: "Collection", cards_per_note: int) -> int:
+    name = _NOTE_TYPE_NAME.format(cards_per_note)
+
+    if (note_type := get_note_type(collection, name)) is None:
+        templates = [
+            TemplateSpec(
+                name=f"Card {index + 1}",
+                front=f"{{{{Front}}}} ({index + 1})",
+                back="{{FrontSide}}<hr id=answer>{{Back}}",
+            )
+            for index in range(cards_per_note)
+        ]
+        note_type = add_note_type(
+            collection,
+            NoteTypeSpec(name=name, fields=["Front", "Back"], templates=templates),
+        )
+
+    return int(note_type["id"])
+
+
+def _add_tags(collection: "Collection", note_ids_by_tag: Dict[str, List[int]]):
+    # Tags are applied through the tag manager rather than written to the notes
+    # table directly, so that they are registered with the collection as well
+    for tag, note_ids in note_ids_by_tag.items():
+        try:  # 2.1.45+
+            collection.tags.bulk_add(note_ids, tag)  # type: ignore[arg-type]
+        except AttributeError:  # legacy
+            collection.tags.bulkAdd(note_ids, tag)  # type: ignore[arg-type]
+
+
+def _simulate_reviews(
+    rng: random.Random, review_history_days: int
+) -> Tuple[List[Tuple[int, int, int]], int]:
+    """Simulate reviews of a card that is answered correctly every time,
+    returning (days ago, interval, last interval) for each review, and the
+    number of days until the card is due next"""
+    reviews = []
+    days_ago = rng.randint(1, review_history_days)
+    interval = 0
+
+    while days_ago > 0:
+        last_interval = interval
+        interval = max(1, round(interval * _DEFAULT_FACTOR / 1000))
+        reviews.append((days_ago, interval, last_interval))
+        days_ago -= interval
+
+    return reviews, -days_ago
+
+
+def generate_collection(
+    collection: "Collection",
+    notes: int,
+    cards_per_note: int = 1,
+    decks: int = 1,
+    tags: int = 0,
+    review_history_days: int = 0,
+    seed: int = 0,
+) -> SyntheticCollection:
+    """Add synthetic notes, cards, and review history to collection
+
+    Notes are spread evenly across the specified number of decks and each
+    receive one of the specified number of tags. If review_history_days is
+    non-zero, each card is given a history of successful reviews starting at
+    a random point within the specified number of days, and scheduled
+    accordingly. Otherwise all cards are new.
+
+    Rows are bulk-inserted into the collection database, bypassing Anki's
+    note and card APIs, which would take hours for large collections. Note
+    contents and scheduling are fully determined by the seed.
+    """
+    if (db := collection.db) is None:
+        raise AnkiSessionError("Collection is closed")
+
+    rng = random.Random(seed)
+    now = int(time.time())
+    today = collection.sched.today
+    day_start = now - now % _SECONDS_PER_DAY
+
+    note_type_id = _get_note_type(collection, cards_per_note=cards_per_note)
+    deck_ids = [
+        int(collection.decks.id(_DECK_NAME.format(index + 1)))  # type: ignore[arg-type]
+        for index in range(decks)
+    ]
+    tag_names = [_TAG_NAME.format(index + 1) for index in range(tags)]
+
+    first_note_id = _get_next_id(db, "notes")
+    next_card_id = _get_next_id(db, "cards")
+    first_position = db.scalar("select max(due)+1 from cards where type = 0") or 0
+    used_review_ids = set()
+
+    note_rows: List[Tuple] = []
+    card_rows: List[Tuple] = []
+    review_rows: List[Tuple] = []
+    note_ids_by_tag: Dict[str, List[int]] = {tag: [] for tag in tag_names}
+
+    for note_index in range(notes):
+        note_id = first_note_id + note_index
+        front = f"Front {note_index + 1} {rng.getrandbits(32):08x}"
+        back = f"Back {note_index + 1}"
+        checksum = int(hashlib.sha1(front.encode("utf-8")).hexdigest()[:8], 16)
+        note_rows.append(
+            (
+                note_id,
+                f"{rng.getrandbits(64):016x}",  # guid
+                note_type_id,
+                now,  # mod
+                -1,  # usn
+                "",  # tags, added separately
+                f"{front}\x1f{back}",
+                front,  # sort field
+                checksum,
+                0,  # flags
+                "",  # data
+            )
+        )
+
+        if tag_names:
+            note_ids_by_tag[rng.choice(tag_names)].append(note_id)
+
+        deck_id = deck_ids[note_index % decks]
+
+        for ordinal in range(cards_per_note):
+            card_id = next_card_id
+            next_card_id += 1
+
+            if review_history_days:
+                reviews, due_in = _simulate_reviews(rng, review_history_days)
+                for review_index, (days_ago, interval, last_interval) in enumerate(
+                    reviews
+                ):
+                    review_time = day_start - days_ago * _SECONDS_PER_DAY
+                    review_id = (review_time + rng.randrange(_SECONDS_PER_DAY)) * 1000
+                    while review_id in used_review_ids:
+                        review_id += 1
+                    used_review_ids.add(review_id)
+                    review_rows.append(
+                        (
+                            review_id,
+                            card_id,
+                            -1,  # usn
+                            3,  # ease
+                            interval,
+                            last_interval,
+                            _DEFAULT_FACTOR,
+                            rng.randint(2000, 15000),  # time taken in ms
+                            1 if review_index else 0,  # review type
+                        )
+                    )
+                # type, queue, due, interval, reps
+                scheduling = (2, 2, today + due_in, reviews[-1][1], len(reviews))
+            else:
+                scheduling = (0, 0, first_position + note_index, 0, 0)
+
+            card_type, queue, due, interval, reps = scheduling
+            card_rows.append(
+                (
+                    card_id,
+                    note_id,
+                    deck_id,
+                    ordinal,
+                    now,  # mod
+                    -1,  # usn
+                    card_type,
+                    queue,
+                    due,
+                    interval,
+                    _DEFAULT_FACTOR if reps else 0,
+                    reps,
+                    0,  # lapses
+                    0,  # left
+                    0,  # original due
+                    0,  # original deck ID
+                    0,  # flags
+                    "",  # data
+                )
+            )
+
+    _insert_rows(db, "notes", note_rows)
+    _insert_rows(db, "cards", card_rows)
+    _insert_rows(db, "revlog", review_rows)
+    _add_tags(collection, note_ids_by_tag)
+
+    # Keep positions of cards added later on after those of the new cards
+    collection.set_config("nextPos", first_position + notes)
+    collection.save()
+
+    return SyntheticCollection(
+        note_type_id=note_type_id,
+        deck_ids=deck_ids,
+        note_ids=[row[0] for row in note_rows],
+        card_count=len(card_rows),
+        review_count=len(review_rows),
+    )
@@ -0,0 +1,97 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, NamedTuple
+
+
+class PhaseTimer:
+    """Records the wall time spent in named phases, e.g. of an Anki launch"""
+
+    def __init__(self):
+        self._timings: Dict[str, float] = {}
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        """Recorded durations in seconds, in the order the phases were entered"""
+        return dict(self._timings)
+
+    def record(self, phase: str, duration: float):
+        self._timings[phase] = self._timings.get(phase, 0.0) + duration
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start_time)
+
+
+class PhaseSummary(NamedTuple):
+    phase: str
+    runs: int
+    total: float
+    mean: float
+    max: float
+
+
+def summarize_timings(all_timings: Iterable[Dict[str, float]]) -> List[PhaseSummary]:
+    """Aggregate the timings of several PhaseTimer runs by phase"""
+    durations: Dict[str, List[float]] = {}
+
+    for timings in all_timings:
+        for phase, duration in timings.items():
+            durations.setdefault(phase, []).append(duration)
+
+    return [
+        PhaseSummary(
+            phase=phase,
+            runs=len(phase_durations),
+            total=sum(phase_durations),
+            mean=sum(phase_durations) / len(phase_durations),
+            max=max(phase_durations),
+        )
+        for phase, phase_durations in durations.items()
+    ]
+
+
+def format_summary_table(summaries: List[PhaseSummary]) -> List[str]:
+    phase_width = max([len("phase")] + [len(summary.phase) for summary in summaries])
+    lines = [
+        f"{'phase':<{phase_width}} {'runs':>6} {'total':>9} {'mean':>9} {'max':>9}"
+    ]
+    for summary in summaries:
+        lines.append(
+            f"{summary.phase:<{phase_width}} {summary.runs:>6}"
+            f" {summary.total:>8.3f}s {summary.mean:>8.3f}s {summary.max:>8.3f}s"
+        )
+    return lines
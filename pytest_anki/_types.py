@@ -29,8 +29,22 @@
 # Any modifications to this file must keep this entire header intact.
 
 
+from enum import Enum
 from pathlib import Path
 from typing import Tuple, Union
 
 PathLike = Union[str, Path]
 UnpackedAddon = Tuple[PathLike, str]  # path to add-on folder, package name
+
+
+class AddonInstallMode(Enum):
+    """Ways of installing unpacked add-ons into the Anki base directory"""
+
+    # Copy the add-on folder into the base directory
+    copy = "copy"
+    # Link to the add-on's source files, sharing their bytecode cache. Writes
+    # bytecode into the __pycache__ folder of the source tree where possible.
+    symlink = "symlink"
+    # Link to a cached copy of the add-on folder, keyed by its contents. Leaves
+    # the source folder untouched.
+    cache = "cache"
@@ -28,12 +28,15 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+import hashlib
 import json
-import socket
-from contextlib import closing
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 from functools import reduce
 from pathlib import Path
-from typing import Any, Union
+from typing import Any, Iterator, Optional, Union
 
 
 def create_json(path: Union[str, Path], data: dict) -> str:
@@ -75,9 +78,104 @@ def get_nested_attribute(obj: Any, attr: str, *args) -> Any:
     return reduce(_getattr, [obj] + attr.split("."))
 
 
-def find_free_port():
-    # https://stackoverflow.com/a/45690594
-    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
-        s.bind(("", 0))
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        return s.getsockname()[1]
+def hash_file(path: Union[str, Path]) -> str:
+    """Get SHA-256 hex digest of the contents of the specified file"""
+    file_hash = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def hash_folder(path: Union[str, Path]) -> str:
+    """Get SHA-256 hex digest of the relative paths and contents of all files in
+    the specified folder, ignoring Python bytecode caches"""
+    folder_path = Path(path)
+    folder_hash = hashlib.sha256()
+    for file_path in sorted(folder_path.rglob("*")):
+        if "__pycache__" in file_path.parts or not file_path.is_file():
+            continue
+        folder_hash.update(file_path.relative_to(folder_path).as_posix().encode())
+        folder_hash.update(hash_file(file_path).encode())
+    return folder_hash.hexdigest()
+
+
+def move_into_place(staging_path: Union[str, Path], target_path: Union[str, Path]):
+    """Atomically move a fully prepared staging folder to its target path
+
+    If the target path was created concurrently by another process in the
+    meantime, the staging folder is discarded instead.
+    """
+    try:
+        os.rename(staging_path, target_path)
+    except OSError:
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+
+@contextmanager
+def base_directory(
+    base_path: str, base_name: str, template_path: Optional[str] = None
+) -> Iterator[str]:
+    """Context manager that creates a uniquely named Anki base folder within
+    base_path, optionally populated from a template, and removes it upon
+    context completion"""
+    if not os.path.isdir(base_path):
+        os.mkdir(base_path)
+    anki_base_dir = tempfile.mkdtemp(prefix=f"{base_name}_", dir=base_path)
+    if template_path:
+        # Plain copy rather than hardlinks, as SQLite modifies files in place
+        shutil.copytree(template_path, anki_base_dir, dirs_exist_ok=True)
+    yield anki_base_dir
+    shutil.rmtree(anki_base_dir, ignore_errors=True)
+
+
+# RAM-backed temporary folders
+
+_RAM_BACKED_FILESYSTEMS = ("tmpfs", "ramfs")
+
+
+def _get_filesystem_type(path: str) -> Optional[str]:
+    """Get type of the file system the specified path resides on, as listed in
+    /proc/self/mounts (Linux only)"""
+    try:
+        with open("/proc/self/mounts") as mounts_file:
+            mounts = [line.split() for line in mounts_file]
+    except OSError:
+        return None
+
+    path = os.path.realpath(path)
+    filesystem_type = None
+    longest_match = -1
+
+    for mount in mounts:
+        if len(mount) < 3:
+            continue
+        mount_point = mount[1].replace("\\040", " ")
+        if path != mount_point and not path.startswith(mount_point.rstrip("/") + "/"):
+            continue
+        # Later entries shadow earlier ones for the same mount point
+        if len(mount_point) >= longest_match:
+            longest_match = len(mount_point)
+            filesystem_type = mount[2]
+
+    return filesystem_type
+
+
+def get_ram_backed_dir(min_free_space: int) -> Optional[str]:
+    """Get path to a writable RAM-backed folder with at least min_free_space
+    bytes available, if any"""
+    for candidate in ("/dev/shm", os.environ.get("XDG_RUNTIME_DIR")):
+        if not candidate or not os.path.isdir(candidate):
+            continue
+        if not os.access(candidate, os.W_OK | os.X_OK):
+            continue
+        if _get_filesystem_type(candidate) not in _RAM_BACKED_FILESYSTEMS:
+            continue
+        try:
+            if shutil.disk_usage(candidate).free < min_free_space:
+                continue
+        except OSError:
+            continue
+        return candidate
+
+    return None
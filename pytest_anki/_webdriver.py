@@ -0,0 +1,121 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import os
+import time
+from typing import List, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.remote_connection import ChromeRemoteConnection
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+
+class _AttachedChromeDriver(webdriver.Chrome):
+    """Chrome web driver that attaches to an already running chromedriver service
+    rather than spawning its own"""
+
+    def __init__(self, service: Service, options: webdriver.ChromeOptions):
+        self.service = service
+        RemoteWebDriver.__init__(
+            self,
+            command_executor=ChromeRemoteConnection(
+                remote_server_addr=service.service_url, keep_alive=True
+            ),
+            desired_capabilities=options.to_capabilities(),
+        )
+        self._is_remote = False
+
+    def quit(self):
+        """End the web driver session, leaving the shared service running"""
+        RemoteWebDriver.quit(self)
+
+
+class ChromeDriverPool:
+
+    """
+    Long-lived chromedriver service that web drivers for multiple Anki sessions
+    attach to, saving the cost of starting a chromedriver process per session.
+
+    The service is started on first use. Services started by the owning process
+    (by default the one that created the pool) are shared with any test processes
+    forked from it.
+    """
+
+    def __init__(
+        self, executable_path: str = "chromedriver", owner_pid: Optional[int] = None
+    ):
+        self._executable_path = executable_path
+        self._owner_pid = owner_pid if owner_pid is not None else os.getpid()
+        self._service: Optional[Service] = None
+        self._service_pid: Optional[int] = None
+        self._attach_times: List[float] = []
+
+    @property
+    def attach_times(self) -> List[float]:
+        """Wall time in seconds it took to attach each web driver in this process"""
+        return list(self._attach_times)
+
+    def start(self):
+        if self._service is not None:
+            return
+        service = Service(self._executable_path)
+        service.start()
+        self._service = service
+        self._service_pid = os.getpid()
+
+    def attach(self, debugger_address: str) -> webdriver.Chrome:
+        """Get a web driver connected to the browser at the provided address,
+        e.g. a Qt web engine remote debugging interface"""
+        start_time = time.perf_counter()
+
+        self.start()
+        assert self._service is not None
+
+        options = webdriver.ChromeOptions()
+        options.add_experimental_option("debuggerAddress", debugger_address)
+        driver = _AttachedChromeDriver(service=self._service, options=options)
+
+        self._attach_times.append(time.perf_counter() - start_time)
+
+        return driver
+
+    def stop(self):
+        """Stop the service if it was started by the current process"""
+        if self._service is None or self._service_pid != os.getpid():
+            return
+        self._service.stop()
+        self._service = self._service_pid = None
+
+    def release(self):
+        """Stop the service if it was started by a process forked from the owning
+        process, which would otherwise leave it running"""
+        if self._service_pid not in (None, self._owner_pid):
+            self.stop()
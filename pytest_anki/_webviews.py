@@ -0,0 +1,253 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+import json
+import urllib.request
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Union
+from weakref import WeakSet
+
+from PyQt5 import sip
+from PyQt5.QtWebEngineWidgets import QWebEngineScript
+
+from ._anki import AnkiWebViewType
+from ._cdp import CDPClient
+from ._errors import AnkiSessionError
+
+if TYPE_CHECKING:
+    from aqt.webview import AnkiWebView
+
+
+class DevToolsTarget(NamedTuple):
+    """Page as listed by the Chromium devtools HTTP interface"""
+
+    id: str
+    title: str
+    url: str
+    web_socket_debugger_url: Optional[str]
+
+
+def get_web_view_title(target_web_view: Union[AnkiWebViewType, str]) -> str:
+    if isinstance(target_web_view, AnkiWebViewType):
+        return target_web_view.value
+    return target_web_view
+
+
+# Long tasks are only reported to performance observers, so an observer needs
+# to be in place before the page starts doing any work
+_LONG_TASK_OBSERVER_SCRIPT = """
+(() => {
+    window.__pytestAnkiLongTasks = [];
+    try {
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) {
+                window.__pytestAnkiLongTasks.push(entry.duration);
+            }
+        }).observe({ entryTypes: ["longtask"] });
+    } catch (error) {
+        window.__pytestAnkiLongTasks = null;
+    }
+})();
+"""
+
+_PAGE_TIMINGS_SCRIPT = """
+(() => {
+    const [navigation] = performance.getEntriesByType("navigation");
+    const paints = {};
+    for (const entry of performance.getEntriesByType("paint")) {
+        paints[entry.name] = entry.startTime;
+    }
+    return {
+        domContentLoaded: navigation ? navigation.domContentLoadedEventEnd : null,
+        load: navigation ? navigation.loadEventEnd : null,
+        firstPaint: "first-paint" in paints ? paints["first-paint"] : null,
+        firstContentfulPaint:
+            "first-contentful-paint" in paints
+                ? paints["first-contentful-paint"]
+                : null,
+        longTasks:
+            window.__pytestAnkiLongTasks === undefined
+                ? null
+                : window.__pytestAnkiLongTasks,
+    };
+})()
+"""
+
+
+@dataclass
+class WebViewMetrics:
+
+    """
+    Render and load performance metrics of a web view, as reported by Chromium.
+
+    Page timings are in milliseconds since navigation start, durations in seconds,
+    and sizes in bytes. Metrics that are not supported by the Chromium version in
+    use are set to None.
+    """
+
+    chromium_version: str
+    dom_content_loaded: Optional[float]
+    load: Optional[float]
+    first_paint: Optional[float]
+    first_contentful_paint: Optional[float]
+    js_heap_used_size: Optional[float]
+    js_heap_total_size: Optional[float]
+    layout_count: Optional[float]
+    layout_duration: Optional[float]
+    recalc_style_count: Optional[float]
+    script_duration: Optional[float]
+    task_duration: Optional[float]
+    long_tasks: Optional[List[float]]  # durations in milliseconds
+    performance_metrics: Dict[str, float] = field(default_factory=dict)  # raw
+
+
+def get_web_view_metrics(
+    target: DevToolsTarget, chromium_version: str, timeout: float = 5.0
+) -> WebViewMetrics:
+    """Collect performance metrics of the provided devtools target via the Chrome
+    DevTools Protocol. Needs to be called from a thread other than the main
+    thread."""
+    if target.web_socket_debugger_url is None:
+        raise AnkiSessionError(
+            f"Web view '{target.title}' is already being debugged by another client"
+        )
+
+    with CDPClient(target.web_socket_debugger_url, timeout=timeout) as client:
+        client.send("Performance.enable")
+        try:
+            result = client.send("Performance.getMetrics")
+        finally:
+            client.send("Performance.disable")
+
+        evaluation = client.send(
+            "Runtime.evaluate",
+            {"expression": _PAGE_TIMINGS_SCRIPT, "returnByValue": True},
+        )
+
+    performance_metrics: Dict[str, float] = {
+        metric["name"]: metric["value"] for metric in result.get("metrics", [])
+    }
+    page_timings: Dict[str, Any] = evaluation.get("result", {}).get("value") or {}
+
+    return WebViewMetrics(
+        chromium_version=chromium_version,
+        dom_content_loaded=page_timings.get("domContentLoaded"),
+        load=page_timings.get("load"),
+        first_paint=page_timings.get("firstPaint"),
+        first_contentful_paint=page_timings.get("firstContentfulPaint"),
+        js_heap_used_size=performance_metrics.get("JSHeapUsedSize"),
+        js_heap_total_size=performance_metrics.get("JSHeapTotalSize"),
+        layout_count=performance_metrics.get("LayoutCount"),
+        layout_duration=performance_metrics.get("LayoutDuration"),
+        recalc_style_count=performance_metrics.get("RecalcStyleCount"),
+        script_duration=performance_metrics.get("ScriptDuration"),
+        task_duration=performance_metrics.get("TaskDuration"),
+        long_tasks=page_timings.get("longTasks"),
+        performance_metrics=performance_metrics,
+    )
+
+
+class WebViewRegistry:
+
+    """
+    Keeps track of the web views created during an Anki session, and of the
+    devtools targets backing them, so that either can be looked up directly
+    by AnkiWebViewType or title.
+
+    If observe_long_tasks is set, a long task observer is injected into all
+    pages loaded by registered web views, for use by get_web_view_metrics.
+    """
+
+    def __init__(self, observe_long_tasks: bool = False):
+        self._observe_long_tasks = observe_long_tasks
+        self._web_views: "WeakSet[AnkiWebView]" = WeakSet()
+
+    def register(self, web_view: "AnkiWebView"):
+        self._web_views.add(web_view)
+
+        if not self._observe_long_tasks or (page := web_view.page()) is None:
+            return
+
+        script = QWebEngineScript()
+        script.setName("pytest_anki_long_task_observer")
+        script.setSourceCode(_LONG_TASK_OBSERVER_SCRIPT)
+        script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+        script.setWorldId(QWebEngineScript.MainWorld)
+        script.setRunsOnSubFrames(False)
+        page.scripts().insert(script)
+
+    def get_web_views(
+        self, target_web_view: Union[AnkiWebViewType, str]
+    ) -> List["AnkiWebView"]:
+        """Get live web views with the provided type or title, visible ones first"""
+        web_view_title = get_web_view_title(target_web_view)
+        web_views = [
+            web_view
+            for web_view in self._web_views
+            if not sip.isdeleted(web_view)
+            and getattr(web_view, "title", None) == web_view_title
+        ]
+        return sorted(web_views, key=lambda web_view: not web_view.isVisible())
+
+    def get_devtools_targets(self, web_debugging_port: int) -> List[DevToolsTarget]:
+        """Get all pages listed by the devtools interface at the provided port
+
+        Listing targets requires the Qt event loop, so this needs to be called
+        from a thread other than the main thread.
+        """
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{web_debugging_port}/json/list"
+        ) as response:
+            targets = json.loads(response.read())
+
+        return [
+            DevToolsTarget(
+                id=target["id"],
+                title=target["title"],
+                url=target["url"],
+                web_socket_debugger_url=target.get("webSocketDebuggerUrl"),
+            )
+            for target in targets
+            if target.get("type") == "page"
+        ]
+
+    def get_devtools_target(
+        self, web_debugging_port: int, target_web_view: Union[AnkiWebViewType, str]
+    ) -> DevToolsTarget:
+        """Get devtools target of web view with the provided type or title"""
+        web_view_title = get_web_view_title(target_web_view)
+
+        for target in self.get_devtools_targets(web_debugging_port):
+            if target.title == web_view_title:
+                return target
+
+        raise AnkiSessionError(
+            f"Could not find web view with provided title '{web_view_title}'"
+        )
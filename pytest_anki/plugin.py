@@ -28,19 +28,143 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
-from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
 
 import pytest
 
 if TYPE_CHECKING:
-    from pytest import FixtureRequest
-    from pytestqt.qtbot import QtBot
     from _pytest.config import Config  # FIXME: not stable
+    from _pytest.config.argparsing import Parser
+    from _pytest.terminal import TerminalReporter
+    from anki.collection import Collection
+    from PyQt5.QtWidgets import QApplication
+    from pytest import FixtureRequest, Item, Session
+    from pytestqt.qtbot import QtBot
+
+    from ._session import AnkiSession
+    from ._webdriver import ChromeDriverPool
+
+# NOTE: The plugin is loaded on every pytest invocation, so any modules that
+# depend on aqt, Qt, or selenium should only be imported once a fixture that
+# launches Anki is actually requested.
 
 from ._anki import get_anki_version
+from ._cache import evict_cache_entries, get_versioned_cache_dir
 from ._config import get_latest_tested_lib_versions
-from ._launch import anki_running
-from ._session import AnkiSession
+from ._errors import AnkiSessionError
+from ._preload import WARM_FORK_MODULES, preload_modules
+from ._timing import format_summary_table, summarize_timings
+from ._util import get_ram_backed_dir
+
+_CACHE_DIR_ATTRIBUTE = "_anki_cache_dir"
+_CHROME_DRIVER_POOL_ATTRIBUTE = "_anki_chrome_driver_pool"
+_MAIN_PID_ATTRIBUTE = "_anki_main_pid"
+_DIST_KEYS_DIR_ATTRIBUTE = "_anki_dist_keys_dir"
+_BASE_PATH_ATTRIBUTE = "_anki_base_path"
+_SHARED_SESSION_ATTRIBUTE = "_anki_shared_session"
+
+# RAM-backed folders with less free space than this are skipped in favor of
+# the system-wide temporary directory
+_MIN_RAM_BACKED_FREE_SPACE = 512 * 1024 * 1024
+_ANKI_SESSION_FIXTURES = ("anki_session",)
+_TIMINGS_PROPERTY = "anki_launch_timings"
+_WEB_DEBUGGING_MARKER = "anki_web_debugging"
+
+
+def pytest_addoption(parser: "Parser"):
+    group = parser.getgroup("anki")
+    group.addoption(
+        "--anki-fork",
+        action="store_true",
+        dest="anki_fork",
+        default=False,
+        help=(
+            "run each test that uses an Anki session in a subprocess forked from a"
+            " pytest process with Anki, aqt, and Qt already imported"
+        ),
+    )
+    group.addoption(
+        "--anki-preload",
+        action="append",
+        dest="anki_preload",
+        default=[],
+        metavar="MODULE",
+        help=(
+            "additional module to import ahead of forking when using --anki-fork,"
+            " e.g. a library vendored by the add-on under test"
+        ),
+    )
+    group.addoption(
+        "--anki-dist",
+        action="store_true",
+        dest="anki_dist",
+        default=False,
+        help=(
+            "when distributing tests with pytest-xdist, run tests that launch Anki"
+            " with identical session parameters on the same worker"
+        ),
+    )
+    group.addoption(
+        "--anki-cache-dir",
+        action="store",
+        dest="anki_cache_dir",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help=(
+            "persist cached Anki environments (profile templates, add-ons, decks)"
+            " across test runs, in PATH or, if omitted, in pytest's cache folder"
+        ),
+    )
+    group.addoption(
+        "--anki-cache-size",
+        action="store",
+        dest="anki_cache_size",
+        type=int,
+        default=1024,
+        metavar="MB",
+        help=(
+            "size that the persistent Anki cache is trimmed to after each run by"
+            " evicting the least recently used entries (default: 1024)"
+        ),
+    )
+    group.addoption(
+        "--anki-base-path",
+        action="store",
+        dest="anki_base_path",
+        default=None,
+        metavar="PATH",
+        help=(
+            "folder to create Anki base folders in (default: a RAM-backed folder"
+            " such as /dev/shm if available, otherwise the system-wide temporary"
+            " directory)"
+        ),
+    )
+    group.addoption(
+        "--anki-ephemeral",
+        action="store_true",
+        dest="anki_ephemeral",
+        default=False,
+        help=(
+            "trade crash safety for speed in test collections and profile"
+            " databases by turning off fsync, journaling to disk, and (on Anki"
+            " 2.1.49 and below) automatic backups"
+        ),
+    )
+    group.addoption(
+        "--anki-timings",
+        action="store_true",
+        dest="anki_timings",
+        default=False,
+        help="show a summary of the time spent in each phase of launching Anki",
+    )
 
 
 def pytest_configure(config: "Config"):
@@ -57,9 +181,161 @@ def pytest_configure(config: "Config"):
         )
         config.issue_config_time_warning(warning, stacklevel=2)
 
+    config.addinivalue_line(
+        "markers",
+        f"{_WEB_DEBUGGING_MARKER}: launch Anki sessions used by the test with the"
+        " Qt web engine remote debugging interface enabled",
+    )
+
+    # The cache is shared by all sessions launched by this process, including
+    # any forked test subprocesses
+    if (cache_base := _get_persistent_cache_base(config)) is not None:
+        cache_dir = str(get_versioned_cache_dir(cache_base))
+        os.makedirs(cache_dir, exist_ok=True)
+        # Workers share the cache with the main process, which trims it once
+        # all of them are done
+        if not hasattr(config, "workerinput"):
+            max_size = config.getoption("anki_cache_size") * 1024 * 1024
+            config.add_cleanup(partial(evict_cache_entries, cache_base, max_size))
+    else:
+        cache_dir = tempfile.mkdtemp(prefix="pytest_anki_cache_")
+        config.add_cleanup(partial(shutil.rmtree, cache_dir, ignore_errors=True))
+    setattr(config, _CACHE_DIR_ATTRIBUTE, cache_dir)
+
+    setattr(config, _BASE_PATH_ATTRIBUTE, _get_base_path(config))
+
+    setattr(config, _MAIN_PID_ATTRIBUTE, os.getpid())
+
+    # Workers report the session parameters of their tests through this folder
+    if config.getoption("anki_dist") and not hasattr(config, "workerinput"):
+        keys_dir = tempfile.mkdtemp(prefix="pytest_anki_dist_")
+        setattr(config, _DIST_KEYS_DIR_ATTRIBUTE, keys_dir)
+        config.add_cleanup(partial(shutil.rmtree, keys_dir, ignore_errors=True))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    if (keys_dir := getattr(node.config, _DIST_KEYS_DIR_ATTRIBUTE, None)) is not None:
+        node.workerinput[_DIST_KEYS_DIR_ATTRIBUTE] = keys_dir
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config: "Config", log):
+    if (keys_dir := getattr(config, _DIST_KEYS_DIR_ATTRIBUTE, None)) is None:
+        return None
+
+    from ._dist import AnkiConfigScheduling
+
+    return AnkiConfigScheduling(config, log, keys_dir=keys_dir)
+
+
+def pytest_collection_modifyitems(config: "Config", items: List["Item"]):
+    if config.getoption("anki_fork"):
+        for item in items:
+            if _uses_anki_session(item):
+                item.add_marker(pytest.mark.forked)
+
+    worker_input = getattr(config, "workerinput", {})
+    if (keys_dir := worker_input.get(_DIST_KEYS_DIR_ATTRIBUTE)) is not None:
+        from ._dist import write_session_config_keys
+
+        write_session_config_keys(
+            keys_dir=keys_dir, worker_id=worker_input["workerid"], items=items
+        )
+
+
+def pytest_collection_finish(session: "Session"):
+    """Warm up the process that Anki test sessions are forked from, and start the
+    chromedriver service shared by all web debugging sessions"""
+    config = session.config
+    if config.getoption("collectonly"):
+        return
+
+    if config.getoption("anki_fork") and any(
+        _uses_anki_session(item) for item in session.items
+    ):
+        preload_modules([*WARM_FORK_MODULES, *config.getoption("anki_preload")])
+
+    if any(item.get_closest_marker(_WEB_DEBUGGING_MARKER) for item in session.items):
+        from selenium.common.exceptions import WebDriverException
+
+        # Starting the service ahead of time lets forked test processes share it.
+        # If chromedriver is unavailable, tests that need it report the error.
+        try:
+            _get_chrome_driver_pool(config).start()
+        except WebDriverException:
+            pass
+
+
+def pytest_terminal_summary(terminalreporter: "TerminalReporter"):
+    if not terminalreporter.config.getoption("anki_timings"):
+        return
+
+    # Timings are attached to test reports, which pytest-forked and pytest-xdist
+    # both pass on to this process
+    all_timings = [
+        value
+        for reports in terminalreporter.stats.values()
+        for report in reports
+        if getattr(report, "when", None) == "teardown"
+        for name, value in getattr(report, "user_properties", ())
+        if name == _TIMINGS_PROPERTY
+    ]
+
+    if not all_timings:
+        return
+
+    terminalreporter.write_sep("-", "Anki launch timings")
+    for line in format_summary_table(summarize_timings(all_timings)):
+        terminalreporter.write_line(line)
+
+
+def _get_base_path(config: "Config") -> str:
+    if base_path := config.getoption("anki_base_path"):
+        return str(Path(base_path).resolve())
+
+    # Keeping base folders in memory spares Anki's frequent SQLite commits, as
+    # well as copying add-ons and tearing down base folders, from hitting disk
+    return get_ram_backed_dir(_MIN_RAM_BACKED_FREE_SPACE) or tempfile.gettempdir()
+
+
+def _get_persistent_cache_base(config: "Config") -> Optional[Path]:
+    if (cache_dir := config.getoption("anki_cache_dir")) is None:
+        return None
+    if cache_dir:
+        return Path(cache_dir).resolve()
+
+    # Storing the cache in pytest's cache folder allows CI systems to restore
+    # it along with the rest of the pytest cache
+    if (cache := getattr(config, "cache", None)) is None:
+        raise pytest.UsageError(
+            "--anki-cache-dir requires a path if pytest's cacheprovider is disabled"
+        )
+    try:  # pytest 7.0+
+        return Path(cache.mkdir("anki"))
+    except AttributeError:  # legacy
+        return Path(str(cache.makedir("anki")))
+
+
+def _get_chrome_driver_pool(config: "Config") -> "ChromeDriverPool":
+    if (pool := getattr(config, _CHROME_DRIVER_POOL_ATTRIBUTE, None)) is None:
+        from ._webdriver import ChromeDriverPool
+
+        # Forked test processes only run the cleanup of the pytest process, so
+        # services started by them are released after each session instead
+        pool = ChromeDriverPool(owner_pid=getattr(config, _MAIN_PID_ATTRIBUTE, None))
+        setattr(config, _CHROME_DRIVER_POOL_ATTRIBUTE, pool)
+        config.add_cleanup(pool.stop)
+    return pool
+
+
+def _uses_anki_session(item: "Item") -> bool:
+    fixture_names = getattr(item, "fixturenames", ())
+    return any(fixture in fixture_names for fixture in _ANKI_SESSION_FIXTURES)
+
 
 @pytest.fixture
-def anki_session(request: "FixtureRequest", qtbot: "QtBot") -> Iterator[AnkiSession]:
+def anki_session(request: "FixtureRequest", qtbot: "QtBot") -> Iterator["AnkiSession"]:
     """Fixture that instantiates Anki, yielding an AnkiSession object
 
     All keyword arguments below may be passed to the fixture by using indirect
@@ -72,7 +348,8 @@ def anki_session(request: "FixtureRequest", qtbot: "QtBot") -> Iterator[AnkiSess
 
     Keyword Arguments:
         base_path {str} -- Path to write Anki base folder to
-            (default: system-wide temporary directory)
+            (default: value of --anki-base-path, a RAM-backed folder such as
+            /dev/shm if available, or the system-wide temporary directory)
 
         base_name {str} -- Base folder name (default: {"anki_base"})
 
@@ -116,18 +393,256 @@ def anki_session(request: "FixtureRequest", qtbot: "QtBot") -> Iterator[AnkiSess
             Each list member needs to be specified as a tuple of add-on package name
             and dictionary of user configuration values to set.
 
-        web_debugging_port {Optional[int]}:
-            If specified, launches Anki with QTWEBENGINE_REMOTE_DEBUGGING set, allowing
-            you to remotely debug Qt web engine views.
+        enable_web_debugging {bool}:
+            Whether to launch Anki with QTWEBENGINE_REMOTE_DEBUGGING set, allowing
+            you to remotely debug Qt web engine views, e.g. via
+            AnkiSession.run_with_chrome_driver. Waiting for the remote debugging
+            interface to come up slows down launching Anki, so it is only enabled
+            for tests marked with @pytest.mark.anki_web_debugging by default.
 
         skip_loading_addons {bool}:
             If set to True, will skip loading packed and unpacked add-ons, giving the
             caller full control over the add-on import time.
+
+        cache_dir {Optional[str]}:
+            Path to a folder for caching base directory templates and extracted
+            deck packages (default: a temporary folder shared across the test run).
+            Set to None to disable caching.
+
+        unpacked_addons_install_mode {pytest_anki.AddonInstallMode}:
+            How to install unpacked_addons (default: {AddonInstallMode.copy}).
+            AddonInstallMode.symlink links to the add-on source files instead of
+            copying them, sharing their bytecode cache across sessions.
+            AddonInstallMode.cache does the same for a copy of the add-on folder
+            that is kept in cache_dir and keyed by its contents, leaving the
+            source folder untouched.
+
+        ephemeral {bool}:
+            Whether to trade crash safety for speed by turning off syncing writes
+            to disk and journaling to disk for the collection and profile
+            databases, and by skipping the automatic collection backup on
+            profile unload on Anki 2.1.49 and below (default: value of
+            --anki-ephemeral)
+    """
+
+    indirect_parameters: Optional[Dict[str, Any]] = getattr(request, "param", None)
+
+    with _anki_running(request, qtbot, indirect_parameters or {}) as session:
+        yield session
+
+
+@pytest.fixture
+def anki_collection(request: "FixtureRequest") -> Iterator["Collection"]:
+    """Fixture that opens a fresh Anki collection without launching Anki's GUI,
+    yielding the anki.collection.Collection object
+
+    Neither aqt nor Qt are imported and no QApplication is created, which makes
+    this fixture start up considerably faster than anki_session. It is meant for
+    tests that only exercise the collection and anki.hooks.
+
+    All keyword arguments below may be passed to the fixture by using indirect
+    parametrization.
+
+    Keyword Arguments:
+        base_path {str} -- Path to write Anki base folder to
+            (default: value of --anki-base-path, a RAM-backed folder such as
+            /dev/shm if available, or the system-wide temporary directory)
+
+        base_name {str} -- Base folder name (default: {"anki_base"})
+
+        profile_name {str} -- Name of the profile folder holding the collection
+            (default: {"User 1"})
+
+        preset_anki_state {Optional[pytest_anki.AnkiStateUpdate]}:
+            Collection config (colconf_storage) to apply ahead of the test.
+            profile_storage and meta_storage are not supported.
+
+        addon_configs {Optional[List[Tuple[str, Dict[str, Any]]]]}:
+            List of add-on package names and user config values to write to the
+            add-ons' meta.json files in the base folder
+
+        ephemeral {bool}:
+            Whether to trade crash safety for speed by turning off syncing writes
+            to disk and journaling to disk for the collection database
+            (default: value of --anki-ephemeral)
     """
+    from ._headless import collection_opened
 
     indirect_parameters: Optional[Dict[str, Any]] = getattr(request, "param", None)
 
-    with anki_running(qtbot=qtbot) if not indirect_parameters else anki_running(
-        qtbot=qtbot, **indirect_parameters
+    parameters: Dict[str, Any] = {
+        "base_path": getattr(request.config, _BASE_PATH_ATTRIBUTE),
+        "ephemeral": request.config.getoption("anki_ephemeral"),
+        **(indirect_parameters or {}),
+    }
+
+    with collection_opened(**parameters) as collection:
+        yield collection
+
+
+@pytest.fixture
+def anki_synthetic_collection(
+    request: "FixtureRequest", anki_session: "AnkiSession"
+) -> Iterator["Collection"]:
+    """Fixture that yields the collection of an anki_session populated with
+    synthetic notes, cards, and review history
+
+    The profile is loaded if it has not been preloaded already. Accepts the same
+    keyword arguments as AnkiSession.generate_collection through indirect
+    parametrization, e.g.:
+
+    > @pytest.mark.parametrize("anki_synthetic_collection",
+                               [dict(notes=200000, review_history_days=365)],
+                               indirect=True)
+    """
+    parameters: Optional[Dict[str, Any]] = getattr(request, "param", None)
+
+    if anki_session.mw.col is not None:
+        anki_session.generate_collection(**(parameters or {}))
+        yield anki_session.collection
+        return
+
+    with anki_session.profile_loaded() as collection:
+        anki_session.generate_collection(**(parameters or {}))
+        yield collection
+
+
+@pytest.fixture(scope="module")
+def anki_session_module_parameters() -> Dict[str, Any]:
+    """Keyword arguments used to launch the Anki session shared by anki_session_module
+
+    Override this fixture in your test module to configure the session. Supports
+    the same arguments as anki_session.
+    """
+    return {}
+
+
+@pytest.fixture(scope="session")
+def anki_session_shared_parameters() -> Dict[str, Any]:
+    """Keyword arguments used to launch the Anki session shared by anki_session_shared
+
+    Override this fixture in your conftest.py to configure the session. Supports
+    the same arguments as anki_session.
+    """
+    return {}
+
+
+@pytest.fixture(scope="module")
+def _anki_session_module(
+    request: "FixtureRequest",
+    qapp: "QApplication",
+    anki_session_module_parameters: Dict[str, Any],
+) -> Iterator["AnkiSession"]:
+    from pytestqt.qtbot import QtBot
+
+    with _anki_running(
+        request,
+        QtBot(request),
+        anki_session_module_parameters,
+        shared_by="anki_session_module",
     ) as session:
         yield session
+
+
+@pytest.fixture(scope="session")
+def _anki_session_shared(
+    request: "FixtureRequest",
+    qapp: "QApplication",
+    anki_session_shared_parameters: Dict[str, Any],
+) -> Iterator["AnkiSession"]:
+    from pytestqt.qtbot import QtBot
+
+    with _anki_running(
+        request,
+        QtBot(request),
+        anki_session_shared_parameters,
+        shared_by="anki_session_shared",
+    ) as session:
+        yield session
+
+
+@pytest.fixture
+def anki_session_module(
+    _anki_session_module: "AnkiSession",
+) -> Iterator["AnkiSession"]:
+    """Fixture that yields an AnkiSession object shared by all tests in a module
+
+    Anki is only launched once per module. After each test, hooks registered by
+    the test are removed, mw.col.conf, mw.pm.profile, and mw.pm.meta are reset
+    to their state before the test, and any windows opened by the test are closed.
+    This makes the fixture well-suited for tests that mostly read Anki state.
+
+    Note that tests using the fixture should not be run forked, as each forked
+    test would otherwise launch its own Anki session. Other Anki sessions
+    cannot be launched in the same process while the shared session is active,
+    so tests using anki_session alongside this fixture need to be forked.
+    """
+    with _anki_session_module.anki_state_reset():
+        yield _anki_session_module
+
+
+@pytest.fixture
+def anki_session_shared(
+    _anki_session_shared: "AnkiSession",
+) -> Iterator["AnkiSession"]:
+    """Fixture that yields an AnkiSession object shared by all tests of a test run
+
+    Behaves like anki_session_module, but only launches Anki once per test run
+    (or per xdist worker).
+    """
+    with _anki_session_shared.anki_state_reset():
+        yield _anki_session_shared
+
+
+@contextmanager
+def _anki_running(
+    request: "FixtureRequest",
+    qtbot: "QtBot",
+    parameters: Dict[str, Any],
+    shared_by: Optional[str] = None,
+) -> Iterator["AnkiSession"]:
+    # Tearing down a session resets app state and hooks that the shared session
+    # still relies on. Forked tests run in their own process and are unaffected.
+    shared_session = getattr(request.config, _SHARED_SESSION_ATTRIBUTE, None)
+    if shared_session is not None and shared_session[0] == os.getpid():
+        raise AnkiSessionError(
+            f"Cannot launch an Anki session while the session of {shared_session[1]}"
+            " is still active in the same process. Please fork tests that launch"
+            " their own Anki session, e.g. via --anki-fork, or run them separately."
+        )
+
+    from ._launch import anki_running
+
+    # Markers are looked up on the requesting node, i.e. the test function for
+    # anki_session, the module for anki_session_module, and the test run for
+    # anki_session_shared
+    web_debugging_marker = request.node.get_closest_marker(_WEB_DEBUGGING_MARKER)
+
+    chrome_driver_pool = _get_chrome_driver_pool(request.config)
+
+    session_parameters: Dict[str, Any] = {
+        "base_path": getattr(request.config, _BASE_PATH_ATTRIBUTE),
+        "cache_dir": getattr(request.config, _CACHE_DIR_ATTRIBUTE, None),
+        "enable_web_debugging": web_debugging_marker is not None,
+        "chrome_driver_pool": chrome_driver_pool,
+        "ephemeral": request.config.getoption("anki_ephemeral"),
+        **parameters,
+    }
+
+    try:
+        with anki_running(qtbot=qtbot, **session_parameters) as session:
+            if shared_by:
+                setattr(
+                    request.config, _SHARED_SESSION_ATTRIBUTE, (os.getpid(), shared_by)
+                )
+            try:
+                yield session
+            finally:
+                if shared_by:
+                    setattr(request.config, _SHARED_SESSION_ATTRIBUTE, None)
+    finally:
+        chrome_driver_pool.release()
+
+    # Only function-scoped sessions can be attributed to a test report
+    if (user_properties := getattr(request.node, "user_properties", None)) is not None:
+        user_properties.append((_TIMINGS_PROPERTY, session.timings))
@@ -35,6 +35,7 @@ Tests for all pytest fixtures provided by the plug-in
 import copy
 import dataclasses
 import json
+import shutil
 import sys
 from contextlib import contextmanager
 from pathlib import Path
@@ -44,7 +45,16 @@ import pytest
 from aqt import AnkiApp
 from aqt.main import AnkiQt
 
-from pytest_anki import AnkiSession, AnkiSessionError, AnkiStateUpdate
+from pytest_anki import (
+    AnkiSession,
+    AnkiSessionError,
+    AnkiStateUpdate,
+    AnkiWebViewType,
+    NoteSpec,
+    NotesSpec,
+    NoteTypeSpec,
+    TemplateSpec,
+)
 
 if TYPE_CHECKING:
     from pytestqt.qtbot import QtBot
@@ -74,6 +84,15 @@ def test_anki_session_launches(anki_session: AnkiSession):
     assert isinstance(anki_session.base, str)
 
 
+def test_anki_session_records_launch_timings(anki_session: AnkiSession):
+    timings = anki_session.timings
+
+    for phase in ("base_directory", "aqt_run", "setup_ui", "addon_load"):
+        assert timings[phase] >= 0
+
+    assert timings["aqt_run"] >= timings["setup_ui"]
+
+
 # AnkiSession API ####
 
 
@@ -125,6 +144,9 @@ def test_collection_loading_unloading(anki_session: AnkiSession, qtbot: "QtBot")
 
 
 _deck_path = Path(__file__).parent / "samples" / "decks" / "sample_deck.apkg"
+_nested_deck_path = (
+    Path(__file__).parent / "samples" / "decks" / "sample_deck_nested.apkg"
+)
 
 
 def _get_deck_ids(collection: "Collection") -> List[int]:
@@ -161,6 +183,239 @@ def test_deck_management(anki_session: AnkiSession):
         assert len(_get_deck_ids(anki_session.collection)) == 1
 
 
+def test_installing_existing_deck_raises(anki_session: AnkiSession):
+    with anki_session.profile_loaded():
+        with anki_session.deck_installed(path=_deck_path):
+            with pytest.raises(AnkiSessionError):
+                anki_session.install_deck(path=_deck_path)
+
+
+def test_bulk_deck_management(anki_session: AnkiSession):
+    with anki_session.profile_loaded():
+        collection = anki_session.collection
+        assert len(_get_deck_ids(collection)) == 1
+
+        with anki_session.decks_installed(paths=[_deck_path]) as deck_ids:
+            assert list(deck_ids) == [_deck_path]
+            assert len(deck_ids[_deck_path]) == 1
+            assert len(_get_deck_ids(collection)) == 2
+            _assert_deck_exists(collection=collection, deck_id=deck_ids[_deck_path][0])
+
+        assert len(_get_deck_ids(collection)) == 1
+
+        deck_ids = anki_session.install_decks(paths=[_deck_path])
+        anki_session.remove_decks(deck_ids=deck_ids[_deck_path])
+        assert len(_get_deck_ids(collection)) == 1
+
+        paths = [_deck_path, _nested_deck_path]
+        with anki_session.decks_installed(paths=paths) as deck_ids:
+            assert list(deck_ids) == paths
+            assert {
+                path: [
+                    collection.decks.name(deck_id)  # type: ignore[arg-type]
+                    for deck_id in ids
+                ]
+                for path, ids in deck_ids.items()
+            } == {
+                _deck_path: ["Standard"],
+                _nested_deck_path: ["Nested Sample", "Nested Sample::Subdeck"],
+            }
+            assert len(_get_deck_ids(collection)) == 4
+
+        assert len(_get_deck_ids(collection)) == 1
+
+
+_notes_spec = NotesSpec(
+    note_types=[
+        NoteTypeSpec(
+            name="Vocabulary",
+            fields=["Word", "Meaning"],
+            templates=[
+                TemplateSpec(name="Recognition", front="{{Word}}", back="{{Meaning}}"),
+                TemplateSpec(name="Recall", front="{{Meaning}}", back="{{Word}}"),
+            ],
+        )
+    ],
+    notes=[
+        NoteSpec(
+            note_type="Vocabulary",
+            fields={"Word": f"word {index}", "Meaning": f"meaning {index}"},
+            deck="Languages::Vocabulary",
+            tags=["vocabulary"],
+        )
+        for index in range(100)
+    ],
+)
+
+
+def test_note_management(anki_session: AnkiSession):
+    with anki_session.profile_loaded():
+        collection = anki_session.collection
+        db = collection.db
+        assert db is not None
+
+        with anki_session.notes_installed(spec=_notes_spec) as installed:
+            assert len(installed.note_ids) == 100
+            assert db.scalar("select count() from cards") == 200
+            assert set(installed.deck_ids) == {"Languages", "Languages::Vocabulary"}
+            assert len(_get_deck_ids(collection)) == 3
+            _assert_deck_exists(
+                collection=collection,
+                deck_id=installed.deck_ids["Languages::Vocabulary"],
+            )
+
+        assert db.scalar("select count() from notes") == 0
+        assert len(_get_deck_ids(collection)) == 1
+        note_type_id = installed.note_type_ids["Vocabulary"]
+        assert collection.models.get(note_type_id) is None  # type: ignore[arg-type]
+
+
+def test_deck_packages_are_extracted_once(anki_session: AnkiSession, tmp_path: Path):
+    from pytest_anki._decks import get_extracted_package, import_deck_package
+
+    extracted_paths = [
+        get_extracted_package(cache_dir=tmp_path, package_path=_deck_path)
+        for _ in range(2)
+    ]
+
+    assert extracted_paths[0] == extracted_paths[1]
+    assert (extracted_paths[0] / "media").exists()
+
+    with anki_session.profile_loaded():
+        import_deck_package(
+            collection=anki_session.collection, path=_deck_path, cache_dir=tmp_path
+        )
+        assert len(_get_deck_ids(anki_session.collection)) == 2
+
+
+def test_deck_imports_are_restored_from_snapshots(
+    anki_session: AnkiSession, tmp_path: Path
+):
+    from pytest_anki._decks import import_deck_packages
+
+    with anki_session.profile_loaded():
+        collection = anki_session.collection
+        imported_deck_ids = []
+
+        for _ in range(2):
+            with anki_session.collection_checkpoint():
+                deck_ids = import_deck_packages(
+                    collection=collection,
+                    paths=[_deck_path],
+                    existing_deck_ids=_get_deck_ids(collection),
+                    cache_dir=tmp_path,
+                    snapshot_pristine=True,
+                )
+                _assert_deck_exists(
+                    collection=collection, deck_id=deck_ids[_deck_path][0]
+                )
+                imported_deck_ids.append(deck_ids)
+
+        assert imported_deck_ids[0] == imported_deck_ids[1]
+        assert len(list((tmp_path / "snapshots").iterdir())) == 1
+        assert len(_get_deck_ids(collection)) == 1
+
+
+def test_deck_imports_are_restored_across_sessions(qtbot: "QtBot", tmp_path: Path):
+    from pytest_anki._launch import anki_running
+
+    imported_deck_ids = []
+
+    for _ in range(2):
+        with anki_running(
+            qtbot,
+            load_profile=True,
+            enable_web_debugging=False,
+            cache_dir=str(tmp_path),
+        ) as session:
+            # Deck IDs are derived from the import time, so only a restored
+            # snapshot yields the same IDs in both sessions
+            imported_deck_ids.append(
+                session.install_decks(paths=[_deck_path, _nested_deck_path])
+            )
+            assert len(_get_deck_ids(session.collection)) == 4
+
+    assert imported_deck_ids[0] == imported_deck_ids[1]
+    assert len(list((tmp_path / "snapshots").iterdir())) == 1
+
+
+def test_deck_imports_into_modified_collections_are_not_snapshotted(
+    anki_session: AnkiSession, tmp_path: Path
+):
+    from pytest_anki._decks import import_deck_packages
+
+    with anki_session.profile_loaded():
+        collection = anki_session.collection
+
+        with anki_session.collection_checkpoint():
+            # Removing the deck leaves deletion records behind
+            with anki_session.deck_installed(path=_deck_path):
+                pass
+
+            import_deck_packages(
+                collection=collection,
+                paths=[_deck_path],
+                existing_deck_ids=_get_deck_ids(collection),
+                cache_dir=tmp_path,
+                snapshot_pristine=True,
+            )
+
+        assert not (tmp_path / "snapshots").exists()
+
+
+_packed_addon_path = (
+    Path(__file__).parent
+    / "samples"
+    / "add-ons"
+    / "simple"
+    / "sample_addon_one.ankiaddon"
+)
+
+
+def test_addon_packages_are_installed_from_cache(
+    anki_session: AnkiSession, tmp_path: Path
+):
+    from pytest_anki._addons import install_addon_from_package
+
+    addon_manager = anki_session.mw.addonManager
+    installed_path = Path(addon_manager.addonsFolder(_packed_addon_path.stem))
+
+    install_addon_from_package(
+        addon_manager=addon_manager, addon_path=_packed_addon_path, cache_dir=tmp_path
+    )
+    meta = addon_manager.addonMeta(_packed_addon_path.stem)
+    shutil.rmtree(installed_path)
+
+    install_addon_from_package(
+        addon_manager=addon_manager, addon_path=_packed_addon_path, cache_dir=tmp_path
+    )
+
+    assert len(list((tmp_path / "packages").iterdir())) == 1
+    assert (installed_path / "__init__.py").is_file()
+    assert addon_manager.addonMeta(_packed_addon_path.stem) == meta
+
+
+def test_collection_checkpoint(anki_session: AnkiSession):
+    with anki_session.profile_loaded():
+        collection = anki_session.collection
+        media_dir_path = collection.media.dir()
+        assert media_dir_path is not None
+        media_dir = Path(media_dir_path)
+
+        with anki_session.collection_checkpoint() as checkpoint_collection:
+            assert checkpoint_collection is collection
+
+            anki_session.install_deck(path=_deck_path)
+            collection.set_config("pytest_anki_checkpoint", True)
+            (media_dir / "checkpoint.txt").write_text("foo")
+
+            assert len(_get_deck_ids(collection)) == 2
+
+        assert len(_get_deck_ids(collection)) == 1
+        assert collection.get_config("pytest_anki_checkpoint", None) is None
+        assert not (media_dir / "checkpoint.txt").exists()
+
+
 @dataclasses.dataclass
 class AddonConfig:
     package_name: str
@@ -292,3 +547,32 @@ def test_anki_state_updates(anki_session: AnkiSession):
             _assert_anki_state_updated(
                 main_window=anki_session.mw, anki_state_update=anki_state_update
             )
+
+
+def test_can_evaluate_javascript(anki_session: AnkiSession):
+    main_webview = AnkiWebViewType.main_webview
+
+    with anki_session.profile_loaded():
+        assert anki_session.get_web_view(main_webview) is anki_session.mw.web
+        assert anki_session.eval_js(main_webview, "1 + 1") == 2
+        assert anki_session.eval_js_batch(
+            main_webview, ["document.title", "[1, 2]"]
+        ) == [main_webview.value, [1, 2]]
+        assert (
+            anki_session.eval_js_async(
+                main_webview,
+                "new Promise((resolve) => setTimeout(() => resolve('done'), 10))",
+            )
+            == "done"
+        )
+
+        with pytest.raises(AnkiSessionError):
+            anki_session.eval_js_async(main_webview, "Promise.reject('failed')")
+
+        with pytest.raises(AnkiSessionError, match="thrown synchronously"):
+            anki_session.eval_js_async(
+                main_webview, "throw new Error('thrown synchronously')"
+            )
+
+        with pytest.raises(AnkiSessionError):
+            anki_session.eval_js("nonexistent web view", "1 + 1")
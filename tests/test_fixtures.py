@@ -33,14 +33,21 @@
 Tests for the AnkiSession API
 """
 
+import json
 import sys
 import tempfile
 from pathlib import Path
-from typing import Final
+from typing import TYPE_CHECKING, Final
 
 import pytest
 
-from pytest_anki import AnkiSession, AnkiStateUpdate
+from pytest_anki import AddonInstallMode, AnkiSession, AnkiStateUpdate
+
+if TYPE_CHECKING:
+    from anki.collection import Collection
+    from pytest import Pytester
+
+pytest_plugins = "pytester"
 
 # Indirect parametrization ####
 
@@ -77,6 +84,31 @@ def test_can_set_anki_session_properties(anki_session: AnkiSession):
         assert lang.currentLang == _lang.split("_")[0]
 
 
+# Base directory templates
+
+
+@pytest.mark.parametrize(ANKI_SESSION, [dict(cache_dir=None)], indirect=True)
+def test_can_launch_without_base_directory_template(anki_session: AnkiSession):
+    with anki_session.profile_loaded():
+        assert anki_session.mw.pm.name == anki_session.user
+
+
+def test_base_directory_templates_are_reused(tmp_path: Path):
+    from pytest_anki._launch import get_base_directory_template
+
+    template_paths = [
+        get_base_directory_template(
+            cache_dir=str(tmp_path), profile_name=_profile_name, lang=_lang
+        )
+        for _ in range(2)
+    ]
+
+    assert template_paths[0] == template_paths[1]
+    assert (Path(template_paths[0]) / "prefs21.db").exists()
+    assert (Path(template_paths[0]) / _profile_name / "collection.anki2").exists()
+    assert len(list((tmp_path / "templates").iterdir())) == 1
+
+
 # Preloading Anki state
 
 
@@ -151,6 +183,75 @@ def test_can_configure_addons(anki_session: AnkiSession):
         assert addon_manager.getConfig(package_name) == config
 
 
+@pytest.mark.parametrize(
+    ANKI_SESSION,
+    [dict(unpacked_addons=[(_state_checker_addon_package, _state_checker_addon_path)])],
+    indirect=True,
+)
+def test_can_report_addon_load_cost(anki_session: AnkiSession):
+    reports = {report.package_name: report for report in anki_session.addon_load_report}
+    report = reports[_state_checker_addon_package]
+
+    assert report.import_time > 0
+    assert report.modules_imported >= 1
+    assert report.hooks_registered == {"gui_hooks.profile_did_open": 1}
+
+    anki_session.assert_addon_load_time_within(
+        budget=60, package_name=_state_checker_addon_package
+    )
+
+    with pytest.raises(AssertionError):
+        anki_session.assert_addon_load_time_within(budget=0)
+
+
+@pytest.mark.parametrize(
+    ANKI_SESSION,
+    [
+        dict(
+            unpacked_addons=_unpacked_addons,
+            addon_configs=_addon_configs,
+            unpacked_addons_install_mode=install_mode,
+        )
+        for install_mode in (AddonInstallMode.symlink, AddonInstallMode.cache)
+    ],
+    indirect=True,
+)
+def test_can_link_unpacked_addons(anki_session: AnkiSession):
+    addon_manager = anki_session.mw.addonManager
+    for package_name, config in _addon_configs:
+        addon_path = Path(anki_session.base) / "addons21" / package_name
+        assert (addon_path / "__init__.py").is_symlink()
+        assert not (addon_path / "meta.json").is_symlink()
+        assert addon_manager.getConfig(package_name) == config
+
+    assert not (_state_checker_addon_path / "meta.json").exists()
+
+
+def test_addons_can_be_linked_from_read_only_sources(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    from pytest_anki._addons import link_addon_folder
+
+    source_path = tmp_path / "source"
+    source_path.mkdir()
+    (source_path / "__init__.py").write_text("")
+
+    original_mkdir = Path.mkdir
+
+    def mkdir(path: Path, *args, **kwargs):
+        if path.name == "__pycache__":
+            raise PermissionError(f"Read-only file system: '{path}'")
+        return original_mkdir(path, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "mkdir", mkdir)
+
+    destination_path = tmp_path / "addon"
+    link_addon_folder(source_path=source_path, destination_path=destination_path)
+
+    assert (destination_path / "__init__.py").is_symlink()
+    assert not (destination_path / "__pycache__").exists()
+
+
 _my_anki_state = AnkiStateUpdate(
     meta_storage={_state_checker_addon_package: True},
     profile_storage={_state_checker_addon_package: True},
@@ -191,3 +292,140 @@ def test_can_preset_anki_state(anki_session: AnkiSession):
             addon.colconf_storage
             == _my_anki_state.colconf_storage[package_name]  # type: ignore
         )
+
+
+@pytest.mark.parametrize(
+    ANKI_SESSION, [dict(load_profile=True, ephemeral=True)], indirect=True
+)
+def test_can_launch_ephemeral_session(anki_session: AnkiSession):
+    profile_db = anki_session.mw.pm.db
+    collection_db = anki_session.collection.db
+    assert profile_db is not None and collection_db is not None
+
+    for db in (profile_db, collection_db):
+        assert db.scalar("pragma journal_mode") == "memory"
+        assert db.scalar("pragma synchronous") == 0
+
+
+@pytest.mark.parametrize(
+    ANKI_SESSION, [dict(load_profile=True, ephemeral=True)], indirect=True
+)
+def test_ephemeral_session_survives_collection_checkpoint(anki_session: AnkiSession):
+    with anki_session.collection_checkpoint() as collection:
+        assert collection.db is not None
+        assert collection.db.scalar("pragma synchronous") == 0
+
+    collection_db = anki_session.collection.db
+    assert collection_db is not None
+    assert collection_db.scalar("pragma journal_mode") == "memory"
+    assert collection_db.scalar("pragma synchronous") == 0
+
+
+# GUI-less collections
+
+
+@pytest.mark.parametrize(
+    "anki_collection",
+    [
+        dict(
+            profile_name=_profile_name,
+            preset_anki_state=AnkiStateUpdate(colconf_storage={"my_addon": True}),
+            addon_configs=[("my_addon", {"enabled": True})],
+        )
+    ],
+    indirect=True,
+)
+def test_can_configure_anki_collection(anki_collection: "Collection"):
+    collection_path = Path(anki_collection.path)
+    assert collection_path.parent.name == _profile_name
+    assert anki_collection.get_config("my_addon") is True
+
+    meta_path = collection_path.parent.parent / "addons21" / "my_addon" / "meta.json"
+    assert json.loads(meta_path.read_text()) == {"config": {"enabled": True}}
+
+
+# Synthetic collections
+
+
+@pytest.mark.parametrize(
+    "anki_synthetic_collection",
+    [dict(notes=100, cards_per_note=2, decks=3, tags=5, review_history_days=30)],
+    indirect=True,
+)
+def test_can_generate_synthetic_collection(
+    anki_synthetic_collection: "Collection", anki_session: AnkiSession
+):
+    db = anki_synthetic_collection.db
+    assert db is not None
+
+    assert db.scalar("select count() from notes") == 100
+    assert db.scalar("select count() from cards where queue = 2") == 200
+    assert db.scalar("select count(distinct did) from cards") == 3
+    assert db.scalar("select count() from revlog") >= 200
+
+    result = anki_session.generate_collection(notes=10, seed=1)
+    assert len(result.note_ids) == 10
+    assert result.card_count == 10
+    assert result.review_count == 0
+    assert db.scalar("select count() from cards where queue = 0") == 10
+
+
+# Shared sessions
+
+
+def test_shared_sessions_reset_state_between_tests(pytester: "Pytester"):
+    pytester.makepyfile(
+        """
+        import pytest
+        from aqt import gui_hooks
+
+        _launched_main_windows = []
+
+
+        @pytest.fixture(scope="module")
+        def anki_session_module_parameters():
+            return dict(load_profile=True)
+
+
+        def _on_state_did_change(*args):
+            pass
+
+
+        def test_can_modify_state(anki_session_module):
+            _launched_main_windows.append(anki_session_module.mw)
+            gui_hooks.state_did_change.append(_on_state_did_change)
+            anki_session_module.mw.pm.profile["pytest_anki"] = True
+            anki_session_module.collection.set_config("pytest_anki", True)
+
+
+        def test_state_was_reset(anki_session_module):
+            assert anki_session_module.mw is _launched_main_windows[0]
+            assert _on_state_did_change not in gui_hooks.state_did_change._hooks
+            assert "pytest_anki" not in anki_session_module.mw.pm.profile
+            assert anki_session_module.collection.get_config("pytest_anki") is None
+        """
+    )
+
+    result = pytester.runpytest_subprocess()
+
+    result.assert_outcomes(passed=2)
+
+
+def test_sessions_cannot_be_launched_alongside_shared_sessions(
+    pytester: "Pytester",
+):
+    pytester.makepyfile(
+        """
+        def test_shared_session(anki_session_shared):
+            pass
+
+
+        def test_own_session(anki_session_shared, anki_session):
+            pass
+        """
+    )
+
+    result = pytester.runpytest_subprocess()
+
+    result.assert_outcomes(passed=1, errors=1)
+    result.stdout.fnmatch_lines(["*session of anki_session_shared is still active*"])
@@ -0,0 +1,304 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+"""
+Tests for the plugin's command line options and hooks
+"""
+
+import os
+import subprocess
+import sys
+from typing import TYPE_CHECKING, Dict, Set
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest import Pytester
+
+pytest_plugins = "pytester"
+
+# Plugin start-up cost
+
+# Modules that take long to import and that are only needed for launching Anki.
+# Note that pytest-qt itself already imports the core Qt modules.
+_EXPENSIVE_MODULES = (
+    "PyQt5.QtWebEngineWidgets",
+    "anki.collection",
+    "anki.importing",
+    "aqt",
+    "selenium.webdriver",
+)
+
+
+def test_plugin_import_does_not_load_expensive_modules():
+    script = (
+        "import sys, pytest_anki.plugin;"
+        f" print([m for m in {_EXPENSIVE_MODULES!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_collection_does_not_load_expensive_modules(pytester: "Pytester"):
+    pytester.makeconftest(
+        f"""
+        import sys
+
+        def pytest_collection_finish(session):
+            loaded = [m for m in {_EXPENSIVE_MODULES!r} if m in sys.modules]
+            print(f"expensive modules loaded: {{loaded}}")
+        """
+    )
+    pytester.makepyfile(
+        """
+        def test_with_anki_session(anki_session):
+            pass
+        """
+    )
+
+    result = pytester.runpytest_subprocess("--collect-only", "-s")
+
+    result.stdout.fnmatch_lines(["expensive modules loaded: []"])
+
+
+def test_anki_collection_does_not_launch_gui(pytester: "Pytester"):
+    pytester.makepyfile(
+        """
+        import sys
+
+        from PyQt5.QtWidgets import QApplication
+
+        def test_with_anki_collection(anki_collection):
+            assert anki_collection.db.scalar("select count() from notes") == 0
+            assert "aqt" not in sys.modules
+            assert "PyQt5.QtWebEngineWidgets" not in sys.modules
+            assert QApplication.instance() is None
+        """
+    )
+
+    result = pytester.runpytest_subprocess("-p", "no:forked")
+
+    result.assert_outcomes(passed=1)
+
+
+# Base folders
+
+
+def test_anki_base_path_overrides_default_base_path(
+    pytester: "Pytester", tmp_path: "Path"
+):
+    base_path = tmp_path / "anki_bases"
+    pytester.makepyfile(
+        f"""
+        from pathlib import Path
+
+        def test_base_path(anki_collection):
+            assert Path(anki_collection.path).parents[2] == Path({str(base_path)!r})
+        """
+    )
+
+    result = pytester.runpytest_subprocess(f"--anki-base-path={base_path}")
+
+    result.assert_outcomes(passed=1)
+
+
+def test_ram_backed_dir_requires_enough_free_space():
+    from pytest_anki._util import get_ram_backed_dir
+
+    assert get_ram_backed_dir(min_free_space=2**62) is None
+
+    if (ram_backed_dir := get_ram_backed_dir(min_free_space=0)) is not None:
+        assert os.access(ram_backed_dir, os.W_OK)
+
+
+# Durability
+
+
+def test_anki_ephemeral_relaxes_collection_durability(pytester: "Pytester"):
+    pytester.makepyfile(
+        """
+        def test_ephemeral_collection(anki_collection):
+            assert anki_collection.db.scalar("pragma journal_mode") == "memory"
+            assert anki_collection.db.scalar("pragma synchronous") == 0
+            anki_collection.set_config("pytest_anki", True)
+            assert anki_collection.get_config("pytest_anki") is True
+        """
+    )
+
+    result = pytester.runpytest_subprocess("--anki-ephemeral")
+
+    result.assert_outcomes(passed=1)
+
+
+# Forking
+
+
+def test_anki_fork_marks_anki_session_tests_as_forked(pytester: "Pytester"):
+    pytester.makepyfile(
+        """
+        def test_with_anki_session(anki_session):
+            pass
+
+        def test_without_anki_session():
+            pass
+        """
+    )
+
+    items, _ = pytester.inline_genitems("--anki-fork")
+    forked = {item.name: item.get_closest_marker("forked") for item in items}
+
+    assert forked["test_with_anki_session"] is not None
+    assert forked["test_without_anki_session"] is None
+
+
+# Launch timings
+
+
+def test_anki_timings_shows_summary_of_recorded_timings(pytester: "Pytester"):
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("duration", [1.0, 3.0])
+        def test_with_timings(request, duration):
+            request.node.user_properties.append(
+                ("anki_launch_timings", {"aqt_run": duration})
+            )
+        """
+    )
+
+    result = pytester.runpytest("--anki-timings", "-p", "no:forked")
+
+    result.stdout.fnmatch_lines(
+        [
+            "*Anki launch timings*",
+            "phase * runs * total * mean * max",
+            "aqt_run * 2 * 4.000s * 2.000s * 3.000s",
+        ]
+    )
+
+
+# Distribution across xdist workers
+
+
+def test_anki_dist_groups_tests_by_session_parameters(pytester: "Pytester"):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.fixture
+        def anki_session(request):  # avoid launching Anki
+            return getattr(request, "param", None)
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("run", range(4))
+        @pytest.mark.parametrize(
+            "anki_session", [dict(lang="de_DE"), dict(lang="fr_FR")], indirect=True
+        )
+        def test_with_anki_session(anki_session, run):
+            pass
+        """
+    )
+
+    result = pytester.runpytest_subprocess(
+        "-n", "2", "--anki-dist", "-v", "-p", "no:forked"
+    )
+    result.assert_outcomes(passed=8)
+
+    workers_by_session: Dict[str, Set[str]] = {}
+    for line in result.outlines:
+        if "PASSED" in line and "test_with_anki_session" in line:
+            worker = line.split("]")[0].strip("[")
+            session = line.split("[")[-1].split("-")[0]
+            workers_by_session.setdefault(session, set()).add(worker)
+
+    assert len(workers_by_session) == 2
+    assert all(len(workers) == 1 for workers in workers_by_session.values())
+
+
+def test_anki_cache_dir_persists_cache_across_runs(
+    pytester: "Pytester", tmp_path: "Path"
+):
+    cache_base = tmp_path / "anki_cache"
+    pytester.makepyfile(
+        f"""
+        from pathlib import Path
+
+        from pytest_anki import __version__
+
+        def test_cache_dir(request):
+            cache_dir = Path(request.config._anki_cache_dir)
+            assert cache_dir == Path({str(cache_base)!r}) / f"pytest-anki-{{__version__}}"
+            (cache_dir / "templates").mkdir(exist_ok=True)
+            (cache_dir / "templates" / "entry").mkdir()
+        """
+    )
+    result = pytester.runpytest_subprocess(f"--anki-cache-dir={cache_base}")
+    result.assert_outcomes(passed=1)
+
+    assert list(cache_base.glob("pytest-anki-*/templates/entry"))
+
+
+def test_cache_eviction_removes_least_recently_used_entries(tmp_path: "Path"):
+    from pytest_anki._cache import evict_cache_entries, get_versioned_cache_dir
+
+    stale_version_dir = tmp_path / "pytest-anki-0.0.0"
+    stale_version_dir.mkdir()
+    unrelated_dir = tmp_path / "user_files"
+    unrelated_dir.mkdir()
+
+    templates_dir = get_versioned_cache_dir(tmp_path) / "templates"
+    for index, name in enumerate(("old", "recent", "new")):
+        entry = templates_dir / name
+        entry.mkdir(parents=True)
+        (entry / "data").write_bytes(b"0" * 100)
+        os.utime(entry, (index, index))
+
+    staging_dir = templates_dir / ".new_staging"
+    staging_dir.mkdir()
+    stale_staging_dir = templates_dir / ".old_staging"
+    stale_staging_dir.mkdir()
+    os.utime(stale_staging_dir, (0, 0))
+
+    evict_cache_entries(tmp_path, max_size=250)
+
+    assert not stale_version_dir.exists()
+    assert unrelated_dir.exists()
+    assert sorted(path.name for path in templates_dir.iterdir()) == [
+        ".new_staging",
+        "new",
+        "recent",
+    ]
@@ -0,0 +1,88 @@
+# pytest-anki
+#
+# Copyright (C)  2019-2021 Aristotelis P. <https://glutanimate.com/>
+#                and contributors (see CONTRIBUTORS file)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <https://glutanimate.com/contact/>.
+#
+# Any modifications to this file must keep this entire header intact.
+
+"""
+Tests for the remote debugging port allocator
+"""
+
+import socket
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from pytest_anki._ports import get_worker_port_range, reserved_port
+
+
+def test_workers_are_assigned_separate_port_ranges():
+    port_ranges = [get_worker_port_range(f"gw{index}") for index in range(32)]
+    port_ranges.append(get_worker_port_range("master"))
+
+    all_ports = [port for port_range in port_ranges for port in port_range]
+
+    assert len(all_ports) == len(set(all_ports))
+    assert get_worker_port_range("gw3") == get_worker_port_range("gw3")
+
+
+def test_reserved_ports_are_not_handed_out_twice(tmp_path: Path):
+    port_range = get_worker_port_range("gw7")
+
+    with reserved_port(lock_dir=tmp_path, worker_id="gw7") as first_port:
+        with reserved_port(lock_dir=tmp_path, worker_id="gw7") as second_port:
+            assert first_port != second_port
+            assert first_port in port_range and second_port in port_range
+
+    with reserved_port(lock_dir=tmp_path, worker_id="gw7") as port:
+        assert port == first_port
+
+
+def test_ports_in_use_are_skipped(tmp_path: Path):
+    port_range = get_worker_port_range("gw8")
+
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        try:
+            s.bind(("127.0.0.1", port_range[0]))
+        except OSError:
+            pytest.skip("Port already in use by another process")
+        s.listen()
+
+        with reserved_port(lock_dir=tmp_path, worker_id="gw8") as port:
+            assert port != port_range[0]
+
+
+def test_inaccessible_lock_files_are_skipped(tmp_path: Path):
+    port_range = get_worker_port_range("gw9")
+
+    # Opening a folder for appending fails, just like opening a lock file owned
+    # by another user
+    (tmp_path / f"{port_range[0]}.lock").mkdir()
+
+    with reserved_port(lock_dir=tmp_path, worker_id="gw9") as port:
+        assert port != port_range[0]
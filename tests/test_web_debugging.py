@@ -36,7 +36,7 @@ import requests
 from pytestqt.qtbot import TimeoutError
 from selenium import webdriver
 
-from pytest_anki import AnkiSession, AnkiWebViewType
+from pytest_anki import AnkiSession, AnkiSessionError, AnkiWebViewType
 
 
 def test_run_in_thread(anki_session: AnkiSession):
@@ -74,6 +74,15 @@ def test_can_supply_timeout(anki_session: AnkiSession):
         )
 
 
+def test_web_debugging_disabled_by_default(anki_session: AnkiSession):
+    assert anki_session.web_debugging_port is None
+    assert "web_debugging_wait" not in anki_session.timings
+
+    with pytest.raises(AnkiSessionError):
+        anki_session.run_with_chrome_driver(lambda driver: None)
+
+
+@pytest.mark.anki_web_debugging
 def test_web_debugging_available_on_launch(anki_session: AnkiSession):
     port = anki_session.web_debugging_port
 
@@ -85,6 +94,7 @@ def test_web_debugging_available_on_launch(anki_session: AnkiSession):
     anki_session.run_in_thread_and_wait(assert_web_debugging_interface_up)
 
 
+@pytest.mark.anki_web_debugging
 def test_web_driver_can_connect(anki_session: AnkiSession):
     def assert_web_driver_connected(driver: webdriver.Chrome):
         assert driver.window_handles
@@ -92,6 +102,7 @@ def test_web_driver_can_connect(anki_session: AnkiSession):
     anki_session.run_with_chrome_driver(assert_web_driver_connected)
 
 
+@pytest.mark.anki_web_debugging
 def test_web_driver_can_select_web_view(anki_session: AnkiSession):
     def assert_web_driver_connected_to_main_web_view(driver: webdriver.Chrome):
         assert driver.title == AnkiWebViewType.main_webview.value
@@ -102,6 +113,7 @@ def test_web_driver_can_select_web_view(anki_session: AnkiSession):
         )
 
 
+@pytest.mark.anki_web_debugging
 def test_web_driver_can_interact_with_anki(anki_session: AnkiSession):
     def switch_to_deck_view(driver: webdriver.Chrome):
         driver.find_element_by_xpath("//*[text()='Default']").click()
@@ -116,3 +128,72 @@ def test_web_driver_can_interact_with_anki(anki_session: AnkiSession):
             assert anki_session.mw.state == "overview"
 
         anki_session.qtbot.wait_until(mw_state_switched)
+
+
+@pytest.mark.anki_web_debugging
+def test_web_drivers_share_chromedriver_service(anki_session: AnkiSession):
+    services = []
+
+    def record_service(driver: webdriver.Chrome):
+        services.append(driver.service)
+
+    anki_session.run_with_chrome_driver(record_service)
+    anki_session.reset_chrome_driver()
+    anki_session.run_with_chrome_driver(record_service)
+
+    assert services[0] is services[1]
+
+    # The service may have been started by the parent of a forked test process,
+    # so we check that it is still up through its HTTP interface rather than
+    # through the process handle
+    assert requests.get(f"{services[0].service_url}/status").ok
+    assert "chrome_driver_attach" in anki_session.timings
+
+
+@pytest.mark.anki_web_debugging
+def test_can_look_up_devtools_target(anki_session: AnkiSession):
+    main_webview = AnkiWebViewType.main_webview
+
+    with anki_session.profile_loaded():
+        target = anki_session.get_devtools_target(main_webview)
+        assert target.title == main_webview.value
+        assert target.web_socket_debugger_url
+
+        with pytest.raises(AnkiSessionError):
+            anki_session.get_devtools_target("nonexistent web view")
+
+
+@pytest.mark.anki_web_debugging
+def test_can_measure_web_view(anki_session: AnkiSession):
+    with anki_session.profile_loaded():
+        metrics = anki_session.measure_web_view(AnkiWebViewType.main_webview)
+
+    assert metrics.chromium_version == anki_session.chromium_version
+    assert metrics.dom_content_loaded is not None and metrics.dom_content_loaded > 0
+    assert metrics.js_heap_used_size
+    assert metrics.layout_count
+    assert isinstance(metrics.long_tasks, list)
+
+
+@pytest.mark.anki_web_debugging
+def test_can_queue_web_driver_tasks(anki_session: AnkiSession):
+    def get_title(driver: webdriver.Chrome) -> str:
+        return driver.title
+
+    main_webview = AnkiWebViewType.main_webview
+
+    with anki_session.profile_loaded():
+        titles = anki_session.run_batch_with_chrome_driver(
+            [get_title, get_title], target_web_view=main_webview
+        )
+        assert titles == [main_webview.value] * 2
+
+        future = anki_session.submit_to_chrome_driver(get_title, main_webview)
+        assert anki_session.wait_for_future(future) == main_webview.value
+
+    latencies = {
+        summary.phase: summary for summary in anki_session.chrome_driver_latencies
+    }
+    assert latencies["queue_wait"].runs == 2
+    assert latencies["execution"].runs == 2
+    assert latencies["round_trip"].runs == 1